@@ -0,0 +1,145 @@
+"""
+Vectorized performance and risk figures over price histories and trade histories of many wikifolios.
+
+Price based functions take a 2-D array with one row per wikifolio and one column per point in time
+(see align_histories) and work along the last axis, so a 1-D array of a single wikifolio works as well.
+nan marks missing prices.
+"""
+from datetime import datetime
+import typing
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from classes.Order import Order
+from classes.PriceHistory import PriceHistory
+
+def align_histories(histories: typing.List[PriceHistory]) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """
+    Puts price histories on their common timeline. Returns the timestamps and a (wikifolios x timestamps)
+    price matrix, prices are carried forward and nan before the first point of a wikifolio.
+    """
+    timestamps = np.unique(np.concatenate([history.timestamps for history in histories]))
+    prices = np.full((len(histories), len(timestamps)), np.nan)
+    for row, history in enumerate(histories):
+        if len(history.timestamps) == 0:
+            continue
+        index = np.searchsorted(history.timestamps, timestamps, side="right") - 1
+        valid = index >= 0
+        prices[row, valid] = np.asarray(history.values)[index[valid]]
+    return timestamps, prices
+
+def returns(prices: np.ndarray) -> np.ndarray:
+    prices = np.asarray(prices, dtype=np.float64)
+    return prices[..., 1:] / prices[..., :-1] - 1
+
+def rolling_returns(prices: np.ndarray, window: int) -> np.ndarray:
+    prices = np.asarray(prices, dtype=np.float64)
+    return prices[..., window:] / prices[..., :-window] - 1
+
+def _windowed(values: np.ndarray, window: typing.Optional[int]) -> np.ndarray:
+    # adds a trailing axis which holds the window, so all reductions work on axis -1
+    values = np.asarray(values, dtype=np.float64)
+    if window is None:
+        return values[..., np.newaxis, :]
+    return sliding_window_view(values, window, axis=-1)
+
+def volatility(returns: np.ndarray, window: typing.Optional[int] = None, periods_per_year: int = 252) -> np.ndarray:
+    """
+    Annualized standard deviation of the returns, over all of them or over every rolling window.
+    """
+    result = np.nanstd(_windowed(returns, window), axis=-1, ddof=1) * np.sqrt(periods_per_year)
+    return result[..., 0] if window is None else result
+
+def sharpe_ratio(
+        returns: np.ndarray,
+        window: typing.Optional[int] = None,
+        risk_free: float = 0.0,
+        periods_per_year: int = 252
+) -> np.ndarray:
+    excess = _windowed(returns, window) - risk_free / periods_per_year
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = np.nanmean(excess, axis=-1) / np.nanstd(excess, axis=-1, ddof=1) * np.sqrt(periods_per_year)
+    return result[..., 0] if window is None else result
+
+def sortino_ratio(
+        returns: np.ndarray,
+        window: typing.Optional[int] = None,
+        risk_free: float = 0.0,
+        periods_per_year: int = 252
+) -> np.ndarray:
+    excess = _windowed(returns, window) - risk_free / periods_per_year
+    downside = np.sqrt(np.nanmean(np.minimum(excess, 0.0) ** 2, axis=-1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = np.nanmean(excess, axis=-1) / downside * np.sqrt(periods_per_year)
+    return result[..., 0] if window is None else result
+
+def drawdown(prices: np.ndarray) -> np.ndarray:
+    """
+    Relative distance of every price to the highest price before it (0 or negative).
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    peaks = np.fmax.accumulate(prices, axis=-1)
+    return prices / peaks - 1
+
+def max_drawdown(prices: np.ndarray, window: typing.Optional[int] = None) -> np.ndarray:
+    if window is None:
+        return np.nanmin(drawdown(prices), axis=-1)
+    windows = _windowed(prices, window)
+    return np.nanmin(windows / np.fmax.accumulate(windows, axis=-1) - 1, axis=-1)
+
+def _is_sell(order_type: str) -> bool:
+    order_type = (order_type or "").lower()
+    return "sell" in order_type or "verkauf" in order_type
+
+def order_arrays(orders: typing.List[Order]) -> typing.Dict[str, np.ndarray]:
+    """
+    Column arrays of a trade history: isin, is_sell, timestamp (ms), execution_price, weightage, performance.
+    """
+    return {
+        "isin": np.array([order.isin for order in orders], dtype=object),
+        "is_sell": np.array([_is_sell(order.orderType) for order in orders], dtype=bool),
+        "timestamp": np.array(
+            [int(datetime.fromisoformat(order.executionDate).timestamp() * 1000) if order.executionDate else -1 for order in orders],
+            dtype=np.int64,
+        ),
+        "execution_price": np.array([np.nan if order.executionPrice is None else order.executionPrice for order in orders], dtype=np.float64),
+        "weightage": np.array([np.nan if order.weightage is None else order.weightage for order in orders], dtype=np.float64),
+        "performance": np.array([np.nan if order.performance is None else order.performance for order in orders], dtype=np.float64),
+    }
+
+def turnover(
+        trade_histories: typing.List[typing.List[Order]],
+        start: typing.Optional[int] = None,
+        end: typing.Optional[int] = None
+) -> np.ndarray:
+    """
+    Sum of the order weightages of every wikifolio, optionally only for orders executed in [start, end)
+    (timestamps in ms).
+    """
+    result = np.zeros(len(trade_histories))
+    for row, orders in enumerate(trade_histories):
+        columns = order_arrays(orders)
+        mask = columns["timestamp"] >= 0
+        if start is not None:
+            mask &= columns["timestamp"] >= start
+        if end is not None:
+            mask &= columns["timestamp"] < end
+        result[row] = np.nansum(columns["weightage"][mask])
+    return result
+
+def realized_pnl(trade_histories: typing.List[typing.List[Order]]) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """
+    Realized result per ISIN of every wikifolio. Only the weightage and the performance of the closing
+    orders are known, so the result is their contribution in portfolio percentage points
+    (weightage * performance / 100). Returns the sorted ISINs and a (wikifolios x ISINs) matrix.
+    """
+    columns = [order_arrays(orders) for orders in trade_histories]
+    isins = np.unique(np.concatenate([c["isin"] for c in columns] + [np.empty(0, dtype=object)]).astype(str))
+    result = np.zeros((len(trade_histories), len(isins)))
+    for row, c in enumerate(columns):
+        if len(c["isin"]) == 0:
+            continue
+        contribution = np.where(c["is_sell"], c["weightage"] * c["performance"] / 100, 0.0)
+        index = np.searchsorted(isins, c["isin"].astype(str))
+        result[row] = np.bincount(index, weights=np.nan_to_num(contribution), minlength=len(isins))
+    return isins, result
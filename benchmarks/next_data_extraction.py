@@ -0,0 +1,40 @@
+"""
+Compares the byte level __NEXT_DATA__ extraction with the lxml DOM fallback.
+
+    python benchmarks/next_data_extraction.py [saved_page.html ...]
+
+Without arguments a synthetic page of typical wikifolio page size (~600 KB of markup, ~250 KB of
+__NEXT_DATA__) is used. Save real pages with e.g. `curl https://www.wikifolio.com/de/de/w/wf000igb03`.
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from wikifolio import Wikifolio
+
+def synthetic_page() -> bytes:
+    data = {"props": {"pageProps": {"data": {
+        "wikifolio": {"id": "00000000-0000-0000-0000-000000000000", "fullName": "Demo & Co", "description": {"content": "<p>Text &amp; more</p>" * 200}},
+        "keyFigures": {"kpis": [{"rankings": [{"ranking": {"value": i * 0.1, "place": i}} for i in range(10)]} for _ in range(3)]},
+        "history": [{"date": "2023-01-01T00:00:00+01:00", "value": i, "label": "Kurs & Wert"} for i in range(2500)],
+    }}}}
+    markup = '<div class="c-item"><a href="/de/de/w/wf000igb03?a=1&b=2">Link &amp; text</a><span>42,00 &euro;</span></div>' * 5000
+    return (
+        '<!DOCTYPE html><html><head><title>wikifolio</title></head><body>' + markup
+        + '<script id="__NEXT_DATA__" type="application/json">' + json.dumps(data) + '</script>'
+        + '<script src="/_next/static/chunks/main.js"></script></body></html>'
+    ).encode("utf-8")
+
+def main() -> None:
+    pages = [(path, open(path, "rb").read()) for path in sys.argv[1:]] or [("synthetic", synthetic_page())]
+    for name, content in pages:
+        assert Wikifolio._parse_wikifolio_page(content) == Wikifolio._parse_wikifolio_page_lxml(content)
+        number = 20
+        fast = min(timeit.repeat(lambda: Wikifolio._parse_wikifolio_page(content), number=number, repeat=5)) / number
+        slow = min(timeit.repeat(lambda: Wikifolio._parse_wikifolio_page_lxml(content), number=number, repeat=5)) / number
+        print("{} ({:.0f} KB): bytes {:.2f} ms, lxml {:.2f} ms, {:.1f}x".format(name, len(content) / 1024, fast * 1000, slow * 1000, slow / fast))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Measures the cold start of short-lived workers: importing wikifolio and reading a price through the
+public client (network access replaced by a stub transport), each in a fresh interpreter.
+
+    python benchmarks/startup.py [runs]
+
+Also reports which heavy optional modules got imported on the way.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import typing
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+HEAVY_MODULES = ("lxml", "websocket", "pyotp", "numpy")
+
+IMPORT_ONLY = "import wikifolio"
+PUBLIC_PRICE = """
+import json, requests, wikifolio
+from classes.PriceInformation import PriceInformation
+class StubTransport(wikifolio.Transport):
+    def request(self, method, url, **kwargs):
+        r = requests.Response()
+        r.status_code = 200
+        r._content = json.dumps({field: None for field in PriceInformation.__dataclass_fields__}).encode()
+        return r
+wikifolio.PublicWikifolio("00000000-0000-0000-0000-000000000000", StubTransport()).get_price_information()
+"""
+
+def measure(code: str, runs: int) -> typing.Tuple[float, str]:
+    timer = "import time, sys; _t = time.perf_counter()\n{}\nprint(time.perf_counter() - _t)\nprint(','.join(m for m in {} if m in sys.modules))".format(code, HEAVY_MODULES)
+    times = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", timer], cwd=ROOT, capture_output=True, text=True, check=True).stdout.split("\n")
+        times.append(float(out[0]))
+    return statistics.median(times), out[1] or "-"
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    for name, code in (("import wikifolio", IMPORT_ONLY), ("public price read", PUBLIC_PRICE)):
+        median, loaded = measure(code, runs)
+        print("{:<18} {:7.1f} ms (median of {}), heavy modules loaded: {}".format(name, median * 1000, runs, loaded))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+@dataclass(frozen=True)
+class CancelResult:
+    order_uuid: Optional[str] # None if the open orders could not be loaded
+    success: bool
+    response: Optional[dict] = field(default=None)
+    error: Optional[str] = field(default=None)
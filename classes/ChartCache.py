@@ -0,0 +1,73 @@
+import json
+import os
+import typing
+import numpy as np
+
+from .PriceHistory import PriceHistory
+
+class ChartCache:
+    """
+    Appendable on-disk store of price histories. Every wikifolio gets one file of fixed size
+    (timestamp, value) records which is read back as memory map, plus a small json file with the
+    HTTP validators of the last download.
+    """
+    record_dtype = np.dtype([("timestamp", "<i8"), ("value", "<f8")])
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, wikifolio_id: str, extension: str) -> str:
+        return os.path.join(self.directory, "{}.{}".format(wikifolio_id, extension))
+
+    def load(self, wikifolio_id: str) -> PriceHistory:
+        path = self._path(wikifolio_id, "bin")
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return PriceHistory(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64))
+        records = np.memmap(path, dtype=self.record_dtype, mode="r")
+        return PriceHistory(records["timestamp"], records["value"])
+
+    def last_timestamp(self, wikifolio_id: str) -> typing.Optional[int]:
+        path = self._path(wikifolio_id, "bin")
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return None
+        with open(path, "rb") as f:
+            f.seek(-self.record_dtype.itemsize, os.SEEK_END)
+            return int(np.frombuffer(f.read(), dtype=self.record_dtype)["timestamp"][0])
+
+    def append(self, wikifolio_id: str, history: PriceHistory) -> int:
+        """
+        Appends the points newer than the last stored one and returns how many were written. A point at
+        the timestamp of the last stored one (e.g. a revised intraday value) replaces it; earlier points
+        are never rewritten.
+        """
+        path = self._path(wikifolio_id, "bin")
+        last = self.last_timestamp(wikifolio_id)
+        if last is not None:
+            revised = np.flatnonzero(history.timestamps == last)
+            if len(revised):
+                record = np.empty(1, dtype=self.record_dtype)
+                record["timestamp"] = last
+                record["value"] = history.values[revised[-1]]
+                with open(path, "r+b") as f:
+                    f.seek(-self.record_dtype.itemsize, os.SEEK_END)
+                    record.tofile(f)
+        mask = slice(None) if last is None else history.timestamps > last
+        records = np.empty(len(history.timestamps[mask]), dtype=self.record_dtype)
+        records["timestamp"] = history.timestamps[mask]
+        records["value"] = history.values[mask]
+        if len(records):
+            with open(path, "ab") as f:
+                records.tofile(f)
+        return len(records)
+
+    def get_validators(self, wikifolio_id: str) -> dict:
+        path = self._path(wikifolio_id, "json")
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def set_validators(self, wikifolio_id: str, validators: dict) -> None:
+        with open(self._path(wikifolio_id, "json"), "w") as f:
+            json.dump(validators, f)
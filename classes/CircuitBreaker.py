@@ -0,0 +1,97 @@
+import collections
+import threading
+import time
+import typing
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling an endpoint family whose circuit breaker is open.
+    """
+
+class CircuitBreaker:
+    """
+    Error rate and latency based circuit breaker for one endpoint family.
+
+    Over the last `window` calls (at least `min_calls`), the breaker opens when the share of failed calls
+    reaches `failure_rate` or the share of calls slower than `slow_call_duration` seconds reaches
+    `slow_call_rate`. While open, calls fail fast with CircuitOpenError. After `open_seconds` it lets
+    `half_open_calls` probe calls through: a fast success closes it again, anything else reopens it.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+            self,
+            name: str,
+            failure_rate: float = 0.5,
+            slow_call_rate: float = 0.8,
+            slow_call_duration: float = 5.0,
+            window: int = 20,
+            min_calls: int = 5,
+            open_seconds: float = 30.0,
+            half_open_calls: int = 1
+    ) -> None:
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_rate = slow_call_rate
+        self.slow_call_duration = slow_call_duration
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self._calls: typing.Deque[typing.Tuple[bool, bool]] = collections.deque(maxlen=window) # (failed, slow)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._state = self.HALF_OPEN
+                self._probes = 0
+            return self._state
+
+    def _open(self) -> None:
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._calls.clear()
+
+    def before_call(self) -> None:
+        state = self.state
+        with self._lock:
+            if state == self.OPEN:
+                raise CircuitOpenError("Circuit breaker {} is open".format(self.name))
+            if state == self.HALF_OPEN:
+                if self._probes >= self.half_open_calls:
+                    raise CircuitOpenError("Circuit breaker {} is half open, probe in progress".format(self.name))
+                self._probes += 1
+
+    def record(self, failed: bool, duration: float) -> None:
+        slow = duration >= self.slow_call_duration
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                if failed or slow:
+                    self._open()
+                else:
+                    self._state = self.CLOSED
+                    self._calls.clear()
+                return
+            self._calls.append((failed, slow))
+            if len(self._calls) >= self.min_calls:
+                failures = sum(1 for call in self._calls if call[0])
+                slow_calls = sum(1 for call in self._calls if call[1])
+                if failures >= self.failure_rate * len(self._calls) or slow_calls >= self.slow_call_rate * len(self._calls):
+                    self._open()
+
+    def call(self, func: typing.Callable, *args, **kwargs):
+        self.before_call()
+        started = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record(True, time.monotonic() - started)
+            raise
+        self.record(False, time.monotonic() - started)
+        return result
@@ -0,0 +1,25 @@
+from dataclasses import dataclass
+import typing
+import numpy as np
+
+from .WikifolioSnapshot import WikifolioSnapshot
+
+@dataclass(frozen=True)
+class KeyFigureTable:
+    values: np.ndarray # shape (len(wikifolios), len(metrics)), missing figures are nan
+    wikifolios: typing.List[str]
+    metrics: typing.List[str]
+
+    @classmethod
+    def from_snapshots(cls, snapshots: typing.List[typing.Optional[WikifolioSnapshot]], names: typing.List[str], metrics: typing.List[str]) -> "KeyFigureTable":
+        values = np.full((len(snapshots), len(metrics)), np.nan)
+        for i, snapshot in enumerate(snapshots):
+            if snapshot is not None:
+                values[i] = snapshot.values
+        return cls(values, list(names), list(metrics))
+
+    def column(self, metric: str) -> np.ndarray:
+        return self.values[:, self.metrics.index(metric)]
+
+    def row(self, wikifolio: str) -> np.ndarray:
+        return self.values[self.wikifolios.index(wikifolio)]
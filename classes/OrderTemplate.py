@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+import json
+import numbers
+import re
+import time
+import typing
+from urllib.parse import urlencode
+
+_ISIN_PATTERN = re.compile(r"^[A-Z]{2}[A-Z0-9]{9}[0-9]$")
+
+def is_valid_isin(isin: str) -> bool:
+    if not isinstance(isin, str) or not _ISIN_PATTERN.match(isin):
+        return False
+    digits = "".join(str(int(c, 36)) for c in isin)
+    total = 0
+    for i, digit in enumerate(reversed(digits)):
+        n = int(digit)
+        if i % 2 == 1:
+            n *= 2
+            if n > 9:
+                n -= 9
+        total += n
+    return total % 10 == 0
+
+class OrderTemplate:
+    """
+    Validated and pre-encoded order form for one wikifolio, ISIN, side and order type. Only the variable
+    fields (amount, prices, validity, quote id) are encoded per submission, and they are checked locally
+    before anything is sent.
+    """
+    order_types = ("limit", "stop", "stoplimit", "quote")
+    quote_codes = {"buy": 910, "sell": 920}
+
+    # the default validUntil (now + 1 day) is formatted at most once per second
+    _default_valid_until: typing.Tuple[int, str] = (0, "")
+
+    def __init__(
+            self,
+            wikifolio_id: str,
+            isin: str,
+            buysell: str,
+            order_type: str = "limit",
+            amount: typing.Optional[int] = None
+    ) -> None:
+        if not is_valid_isin(isin):
+            raise ValueError("Invalid ISIN: {}".format(isin))
+        if buysell not in ("buy", "sell"):
+            raise ValueError("buysell must be 'buy' or 'sell', not {}".format(buysell))
+        if order_type not in self.order_types:
+            raise ValueError("Unknown order type {}, expected one of {}".format(order_type, self.order_types))
+        if amount is not None:
+            self._check_amount(amount)
+        self.wikifolio_id = wikifolio_id
+        self.isin = isin
+        self.buysell = buysell
+        self.order_type = order_type
+        self.amount = amount
+        self._static_fields = urlencode({
+            "buysell": buysell,
+            "orderType": order_type,
+            "underlyingIsin": isin,
+            "wikifolioId": wikifolio_id,
+        })
+        # GetQuote invocation for the quotehub, only the amount is filled in
+        self._quote_prefix = json.dumps({"H": "quotehub", "M": "GetQuote", "A": [wikifolio_id, isin]})[:-2] + ', "'
+        self._quote_suffix = '", {}], "I": '.format(self.quote_codes[buysell])
+
+    @staticmethod
+    def _check_amount(amount) -> None:
+        if isinstance(amount, bool) or not isinstance(amount, numbers.Integral) or amount <= 0:
+            raise ValueError("amount must be a positive integer, not {}".format(amount))
+
+    @staticmethod
+    def _check_price(name: str, price) -> None:
+        if isinstance(price, bool) or not isinstance(price, numbers.Real) or not price > 0:
+            raise ValueError("{} must be a positive number, not {}".format(name, price))
+
+    @classmethod
+    def default_valid_until(cls) -> str:
+        second = int(time.time())
+        if cls._default_valid_until[0] != second:
+            cls._default_valid_until = (second, datetime.strftime(datetime.now() + timedelta(days=1), "%Y-%m-%dT%X.%fZ"))
+        return cls._default_valid_until[1]
+
+    def encode(
+            self,
+            amount: typing.Optional[int] = None,
+            limit_price: typing.Optional[float] = None,
+            stop_price: typing.Optional[float] = None,
+            valid_until: typing.Optional[str] = None,
+            quote_id: typing.Optional[str] = None,
+            stop_loss_stop_price: typing.Optional[float] = None,
+            stop_loss_limit_price: typing.Optional[float] = None,
+            take_profit_limit_price: typing.Optional[float] = None
+    ) -> str:
+        """
+        Returns the form-encoded body of the order.
+        """
+        amount = self.amount if amount is None else amount
+        self._check_amount(amount)
+        if self.order_type in ("limit", "stoplimit"):
+            self._check_price("limit_price", limit_price)
+        if self.order_type in ("stop", "stoplimit"):
+            self._check_price("stop_price", stop_price)
+        for name, price in (
+                ("stop_loss_stop_price", stop_loss_stop_price),
+                ("stop_loss_limit_price", stop_loss_limit_price),
+                ("take_profit_limit_price", take_profit_limit_price)):
+            if price is not None:
+                self._check_price(name, price)
+
+        if self.order_type == "quote":
+            if not quote_id:
+                raise ValueError("quote orders need a quote_id")
+            valid_until = ""
+            stop_price = ""
+        else:
+            valid_until = valid_until or self.default_valid_until()
+            stop_price = 0 if stop_price is None else stop_price
+        fields = {
+            "amount": amount,
+            "limitPrice": "" if limit_price is None else limit_price,
+            "stopLossLimitPrice": "" if stop_loss_limit_price is None else stop_loss_limit_price,
+            "stopLossStopPrice": "" if stop_loss_stop_price is None else stop_loss_stop_price,
+            "stopPrice": stop_price,
+            "takeProfitLimitPrice": "" if take_profit_limit_price is None else take_profit_limit_price,
+            "validUntil": valid_until,
+        }
+        if quote_id:
+            fields["quoteId"] = quote_id
+        return urlencode(fields) + "&" + self._static_fields
+
+    def quote_request(self, amount: typing.Optional[int] = None, invocation_id: int = 1) -> str:
+        """
+        Returns the SignalR GetQuote message for this ISIN and side.
+        """
+        amount = self.amount if amount is None else amount
+        self._check_amount(amount)
+        return self._quote_prefix + str(amount) + self._quote_suffix + str(invocation_id) + "}"
@@ -0,0 +1,18 @@
+from dataclasses import dataclass
+import typing
+
+@dataclass(frozen=True)
+class PortfolioChange:
+    OPENED = "opened"
+    CLOSED = "closed"
+    QUANTITY_CHANGED = "quantity_changed"
+    WEIGHTING_CHANGED = "weighting_changed"
+
+    wikifolio: str
+    isin: str
+    name: str
+    kind: str
+    old_quantity: typing.Optional[float]
+    new_quantity: typing.Optional[float]
+    old_percentage: typing.Optional[float]
+    new_percentage: typing.Optional[float]
@@ -0,0 +1,65 @@
+import time
+import typing
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .PortfolioChange import PortfolioChange
+
+class PortfolioDiffer:
+    """
+    Keeps the last portfolio of every wikifolio as a compact {isin: (quantity, percentage, name)} snapshot
+    and reports only the positions which changed between two snapshots.
+    """
+
+    def __init__(self, weighting_tolerance: float = 0.0, emit_initial: bool = False) -> None:
+        self.weighting_tolerance = weighting_tolerance
+        self.emit_initial = emit_initial
+        self._snapshots: typing.Dict[str, typing.Dict[str, typing.Tuple[float, float, str]]] = {}
+
+    def update(self, wikifolio: str, items: typing.Iterable[dict]) -> typing.List[PortfolioChange]:
+        """
+        Stores the raw portfolio items (as returned by the portfolio endpoint) as new snapshot for the
+        wikifolio and returns the changes against the previous one.
+        """
+        new = {item["isin"]: (item["quantity"], item["percentage"], item["name"]) for item in items}
+        old = self._snapshots.get(wikifolio)
+        self._snapshots[wikifolio] = new
+        if old is None:
+            if not self.emit_initial:
+                return []
+            old = {}
+
+        changes = []
+        for isin, (quantity, percentage, name) in new.items():
+            previous = old.get(isin)
+            if previous is None:
+                changes.append(PortfolioChange(wikifolio, isin, name, PortfolioChange.OPENED, None, quantity, None, percentage))
+            elif previous[0] != quantity:
+                changes.append(PortfolioChange(wikifolio, isin, name, PortfolioChange.QUANTITY_CHANGED, previous[0], quantity, previous[1], percentage))
+            elif abs(previous[1] - percentage) > self.weighting_tolerance:
+                changes.append(PortfolioChange(wikifolio, isin, name, PortfolioChange.WEIGHTING_CHANGED, quantity, quantity, previous[1], percentage))
+        for isin, (quantity, percentage, name) in old.items():
+            if isin not in new:
+                changes.append(PortfolioChange(wikifolio, isin, name, PortfolioChange.CLOSED, quantity, None, percentage, None))
+        return changes
+
+    def snapshot(self, wikifolio: str) -> typing.Dict[str, typing.Tuple[float, float, str]]:
+        return dict(self._snapshots.get(wikifolio, {}))
+
+    def watch(self, wikifolios: typing.List["Wikifolio"], interval: float = 60, max_workers: int = 4) -> typing.Iterator[PortfolioChange]:
+        """
+        Polls the portfolios of all wikifolios concurrently every `interval` seconds and yields the merged
+        stream of changes. Runs until the consumer stops iterating.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while True:
+                started = time.monotonic()
+                futures = {executor.submit(wf._get_portfolio_items): wf for wf in wikifolios}
+                for future in as_completed(futures):
+                    wf = futures[future]
+                    try:
+                        items = future.result()
+                    except Exception as e:
+                        print("Error at PortfolioDiffer.watch -> Could not load portfolio of {}: {}".format(wf.name, e))
+                        continue
+                    yield from self.update(wf.name, items)
+                time.sleep(max(0.0, interval - (time.monotonic() - started)))
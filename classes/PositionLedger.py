@@ -0,0 +1,161 @@
+import threading
+import time
+import typing
+
+from .ExecutionStatusResponse import ExecutionStatusResponse
+from .OrderResponse import OrderResponse
+
+class PositionLedger:
+    """
+    Local book of the positions and the cash of one wikifolio, so pre-trade checks don't need a round-trip.
+    Seeded from the portfolio endpoint when it is created, updated from order and execution status responses and reconciled
+    with the server in the background.
+
+    wikifolio reports the cash balance only with the execution status of an order, so the current balance
+    has to be passed as `cash`; it is kept up to date from every execution status afterwards. Pending orders
+    are dropped once their execution status is final, or after `pending_ttl` seconds if it can't be queried.
+    """
+
+    def __init__(self, wikifolio: "Wikifolio", cash: float, pending_ttl: float = 86400) -> None:
+        self.wikifolio = wikifolio
+        self.pending_ttl = pending_ttl
+        self.last_reconciled: typing.Optional[float] = None
+        self._cash = cash
+        self._positions: typing.Dict[str, float] = {}
+        # orderGuid -> (isin, buysell, amount, limit price, recorded at)
+        self._pending: typing.Dict[str, typing.Tuple[str, str, int, typing.Optional[float], float]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: typing.Optional[threading.Thread] = None
+        self.reconcile()
+
+    def reconcile(self) -> None:
+        """
+        Settles the pending orders with their execution status and replaces the local positions with the
+        ones currently reported by wikifolio.
+        """
+        with self._lock:
+            pending = list(self._pending)
+        statuses = {}
+        for order_uuid in pending:
+            try:
+                statuses[order_uuid] = self.wikifolio.trade_execution_status(order_uuid)
+            except Exception as e:
+                print("Error at PositionLedger.reconcile -> Could not check order {}: {}".format(order_uuid, e))
+        # fetched after the statuses, so executions reported there are already included
+        positions = {}
+        for item in self.wikifolio._get_portfolio_items():
+            positions[item["isin"]] = positions.get(item["isin"], 0) + item["quantity"]
+        now = time.time()
+        with self._lock:
+            for order_uuid, status in statuses.items():
+                if not status.isRejected:
+                    self._cash = status.cashAccountCurrentBalance
+                if status.isRejected or not status.continueCheck:
+                    self._pending.pop(order_uuid, None)
+            for order_uuid, order in list(self._pending.items()):
+                if now - order[4] > self.pending_ttl:
+                    del self._pending[order_uuid]
+            self._positions = positions
+            self.last_reconciled = now
+
+    def start_reconciliation(self, interval: float = 60) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._reconcile_loop, args=(interval,), daemon=True)
+        self._thread.start()
+
+    def stop_reconciliation(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _reconcile_loop(self, interval: float) -> None:
+        while not self._stop.is_set():
+            try:
+                self.reconcile()
+            except Exception as e:
+                print("Error at PositionLedger.reconcile -> " + str(e))
+            self._stop.wait(interval)
+
+    def record_order(
+            self,
+            response: OrderResponse,
+            isin: str,
+            buysell: str,
+            amount: int,
+            limit_price: typing.Optional[float] = None
+    ) -> None:
+        """
+        Remembers an accepted order as pending until its execution status is known.
+        """
+        if response.success and response.orderGuid:
+            with self._lock:
+                self._pending[response.orderGuid] = (isin, buysell, amount, limit_price, time.time())
+
+    def apply_execution_status(self, order_uuid: str, status: ExecutionStatusResponse) -> None:
+        with self._lock:
+            order = self._pending.get(order_uuid)
+            if status.isRejected:
+                self._pending.pop(order_uuid, None)
+                return
+            self._cash = status.cashAccountCurrentBalance
+            if order is not None and not status.continueCheck:
+                self._pending.pop(order_uuid)
+                self._positions[order[0]] = status.quantity
+
+    def quantity(self, isin: str) -> float:
+        return self._positions.get(isin, 0)
+
+    def sellable_quantity(self, isin: str) -> float:
+        """
+        Current quantity minus the amount already reserved by pending sell orders.
+        """
+        with self._lock:
+            reserved = sum(amount for _isin, buysell, amount, _, _ in self._pending.values() if _isin == isin and buysell == "sell")
+            return self._positions.get(isin, 0) - reserved
+
+    def available_cash(self) -> float:
+        """
+        Cash balance minus the volume of pending buy limit orders.
+        """
+        with self._lock:
+            reserved = sum(amount * limit for _, buysell, amount, limit, _ in self._pending.values() if buysell == "buy" and limit)
+            return self._cash - reserved
+
+    def set_cash(self, cash: float) -> None:
+        with self._lock:
+            self._cash = cash
+
+    def can_sell(self, isin: str, amount: int) -> bool:
+        return self.sellable_quantity(isin) >= amount
+
+    def can_buy(self, amount: int, price: float) -> bool:
+        return self.available_cash() >= amount * price
+
+    def buy_limit(self, amount: int, isin: str, limit_price: float, valid_until: typing.Optional[str] = None) -> OrderResponse:
+        response = self.wikifolio.buy_limit(amount, isin, limit_price, valid_until)
+        self.record_order(response, isin, "buy", amount, limit_price)
+        return response
+
+    def sell_limit(self, amount: int, isin: str, limit_price: float, valid_until: typing.Optional[str] = None) -> OrderResponse:
+        response = self.wikifolio.sell_limit(amount, isin, limit_price, valid_until)
+        self.record_order(response, isin, "sell", amount, limit_price)
+        return response
+
+    def buy_quote(self, amount: int, isin: str) -> OrderResponse:
+        response = self.wikifolio.buy_quote(amount, isin)
+        self.record_order(response, isin, "buy", amount)
+        return response
+
+    def sell_quote(self, amount: int, isin: str) -> OrderResponse:
+        response = self.wikifolio.sell_quote(amount, isin)
+        self.record_order(response, isin, "sell", amount)
+        return response
+
+    def check_execution(self, order_uuid: str) -> ExecutionStatusResponse:
+        status = self.wikifolio.trade_execution_status(order_uuid)
+        self.apply_execution_status(order_uuid, status)
+        return status
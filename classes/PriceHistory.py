@@ -0,0 +1,38 @@
+from dataclasses import dataclass
+import numbers
+import typing
+import numpy as np
+
+# timestamps below this can't be milliseconds of a wikifolio price (it would be before 1973), they are
+# most likely seconds
+_MIN_MILLISECONDS = 100_000_000_000
+
+@dataclass(frozen=True)
+class PriceHistory:
+    timestamps: np.ndarray # int64, milliseconds since epoch, ascending
+    values: np.ndarray # float64
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @classmethod
+    def from_chart_data(cls, raw_json: dict) -> "PriceHistory":
+        """
+        Reads the price series of a /api/chart/{id}/data response:
+        {"chartData": {"timestamps": [milliseconds, ...], "values": [price, ...]}, ...}.
+        Raises ValueError for any other layout or for timestamps which are not milliseconds.
+        """
+        try:
+            chart_data = raw_json["chartData"]
+            timestamps, values = chart_data["timestamps"], chart_data["values"]
+        except (KeyError, TypeError):
+            raise ValueError("Unexpected chart data layout, expected chartData.timestamps and chartData.values")
+        if not isinstance(timestamps, list) or not isinstance(values, list) or len(timestamps) != len(values):
+            raise ValueError("chartData.timestamps and chartData.values must be lists of the same length")
+        for timestamp in timestamps:
+            if isinstance(timestamp, bool) or not isinstance(timestamp, numbers.Integral) or timestamp < _MIN_MILLISECONDS:
+                raise ValueError("Chart timestamp {!r} is not in milliseconds since epoch".format(timestamp))
+        timestamps = np.array(timestamps, dtype=np.int64)
+        values = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+        order = np.argsort(timestamps, kind="stable")
+        return cls(timestamps[order], values[order])
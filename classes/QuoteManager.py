@@ -0,0 +1,153 @@
+import json
+import threading
+import time
+import typing
+
+from .CircuitBreaker import CircuitOpenError
+from .OrderResponse import OrderResponse
+from .OrderTemplate import OrderTemplate
+
+class QuoteManager:
+    """
+    Keeps fresh quotes for a watch set of (isin, amount, buysell) over one persistent quotehub
+    connection, so quote orders can be placed without waiting for GetQuote first.
+    Quotes are assumed to be valid for `max_age` seconds and are refreshed `refresh_margin` seconds
+    before that. A quote is handed out only once.
+    Connects and GetQuote calls go through the "quote" circuit breaker of the wikifolio; while it is open,
+    refreshing pauses for `open_backoff` seconds at a time.
+    """
+
+    def __init__(self, wikifolio: "Wikifolio", max_age: float = 5.0, refresh_margin: float = 1.0, open_backoff: float = 1.0) -> None:
+        self.wikifolio = wikifolio
+        self.max_age = max_age
+        self.refresh_margin = refresh_margin
+        self.open_backoff = open_backoff
+        self.hits = 0
+        self.misses = 0
+        self._templates: typing.Dict[typing.Tuple[str, int, str], OrderTemplate] = {}
+        # (isin, amount, buysell) -> (quote id, time of the quote)
+        self._quotes: typing.Dict[typing.Tuple[str, int, str], typing.Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: typing.Optional[threading.Thread] = None
+        self._ws = None
+        self._invocation_id = 0
+
+    def watch(self, isin: str, amount: int, buysell: str) -> None:
+        template = self.wikifolio.order_template(isin, buysell, "quote")
+        template.quote_request(amount) # validates the amount
+        with self._lock:
+            self._templates[(isin, amount, buysell)] = template
+
+    def unwatch(self, isin: str, amount: int, buysell: str) -> None:
+        with self._lock:
+            self._templates.pop((isin, amount, buysell), None)
+            self._quotes.pop((isin, amount, buysell), None)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._disconnect()
+
+    def _disconnect(self) -> None:
+        if self._ws is not None:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
+            self._ws = None
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.is_set():
+            now = time.monotonic()
+            with self._lock:
+                due = [
+                    key for key in self._templates
+                    if key not in self._quotes or now - self._quotes[key][1] >= self.max_age - self.refresh_margin
+                ]
+            backoff = 0.05 if due else 0.2
+            for key in due:
+                if self._stop.is_set():
+                    break
+                try:
+                    self._refresh(key)
+                except CircuitOpenError:
+                    backoff = self.open_backoff
+                    break
+                except Exception as e:
+                    print("Error at QuoteManager._refresh -> " + str(e))
+                    self._disconnect()
+            self._stop.wait(backoff)
+
+    def _refresh(self, key: typing.Tuple[str, int, str]) -> None:
+        with self._lock:
+            template = self._templates.get(key)
+        if template is None:
+            return
+        breaker = self.wikifolio.circuit_breaker("quote")
+        if self._ws is None:
+            self._ws = breaker.call(self.wikifolio._connect_quotehub)
+        breaker.call(self._request_quote, key, template)
+
+    def _request_quote(self, key: typing.Tuple[str, int, str], template: OrderTemplate) -> None:
+        self._invocation_id += 1
+        requested = time.monotonic()
+        self._ws.send(template.quote_request(key[1], self._invocation_id))
+        while True:
+            message = json.loads(self._ws.recv_data()[1].decode("utf-8"))
+            for hub_message in message.get("M", []):
+                for argument in hub_message.get("A", []):
+                    if isinstance(argument, dict) and "QuoteId" in argument:
+                        with self._lock:
+                            if key in self._templates:
+                                self._quotes[key] = (argument["QuoteId"], requested)
+                        return
+
+    def get_quote(self, isin: str, amount: int, buysell: str) -> typing.Optional[str]:
+        """
+        Returns and consumes a still valid quote id, or None if there is none.
+        """
+        key = (isin, amount, buysell)
+        with self._lock:
+            quote = self._quotes.pop(key, None)
+            if quote is not None and time.monotonic() - quote[1] < self.max_age:
+                self.hits += 1
+                return quote[0]
+            self.misses += 1
+            return None
+
+    def quote_age(self, isin: str, amount: int, buysell: str) -> typing.Optional[float]:
+        with self._lock:
+            quote = self._quotes.get((isin, amount, buysell))
+        return None if quote is None else time.monotonic() - quote[1]
+
+    @property
+    def hit_rate(self) -> typing.Optional[float]:
+        total = self.hits + self.misses
+        return self.hits / total if total else None
+
+    def buy(self, amount: int, isin: str) -> OrderResponse:
+        """
+        Places a quote order with a pooled quote, falls back to Wikifolio.buy_quote without one.
+        """
+        quote_id = self.get_quote(isin, amount, "buy")
+        if quote_id is None:
+            return self.wikifolio.buy_quote(amount, isin)
+        template = self.wikifolio.order_template(isin, "buy", "quote")
+        return self.wikifolio.place_order(template, self.wikifolio._order_cookies(), amount=amount, quote_id=quote_id)
+
+    def sell(self, amount: int, isin: str) -> OrderResponse:
+        quote_id = self.get_quote(isin, amount, "sell")
+        if quote_id is None:
+            return self.wikifolio.sell_quote(amount, isin)
+        template = self.wikifolio.order_template(isin, "sell", "quote")
+        return self.wikifolio.place_order(template, self.wikifolio._order_cookies(), amount=amount, quote_id=quote_id)
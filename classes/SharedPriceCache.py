@@ -0,0 +1,131 @@
+import sys
+import time
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+
+from .PriceInformation import PriceInformation
+
+class SharedPriceCache:
+    """
+    Latest prices of a fixed set of wikifolios in a shared memory block, written by one process and read
+    lock-free by any number of others.
+
+    Layout: the number of wikifolios (int64), their ids (36 byte ascii each) and one fixed size slot per
+    wikifolio. Every slot starts with a sequence number which the writer makes odd before and even after
+    an update (seqlock); readers retry while it is odd or changed during their read, so they never see a
+    torn update. A sequence number of 0 means no price was published yet.
+    """
+    id_dtype = np.dtype("S36")
+    slot_dtype = np.dtype([
+        ("seq", "<u8"),
+        ("bid", "<f8"),
+        ("ask", "<f8"),
+        ("midPrice", "<f8"),
+        ("quantityLimitBid", "<f8"),
+        ("quantityLimitAsk", "<f8"),
+        ("updated", "<f8"),
+    ])
+    price_fields = ("bid", "ask", "midPrice", "quantityLimitBid", "quantityLimitAsk")
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool) -> None:
+        self.shm = shm
+        self.owner = owner
+        count = int(np.ndarray((1,), dtype="<i8", buffer=shm.buf)[0])
+        self.ids = np.ndarray((count,), dtype=self.id_dtype, buffer=shm.buf, offset=8)
+        self.slots = np.ndarray((count,), dtype=self.slot_dtype, buffer=shm.buf, offset=8 + count * self.id_dtype.itemsize)
+        self.index = {wikifolio_id.decode("ascii"): i for i, wikifolio_id in enumerate(self.ids)}
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @classmethod
+    def create(cls, wikifolio_ids: typing.List[str], name: typing.Optional[str] = None) -> "SharedPriceCache":
+        size = 8 + len(wikifolio_ids) * (cls.id_dtype.itemsize + cls.slot_dtype.itemsize)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        np.ndarray((1,), dtype="<i8", buffer=shm.buf)[0] = len(wikifolio_ids)
+        np.ndarray((len(wikifolio_ids),), dtype=cls.id_dtype, buffer=shm.buf, offset=8)[:] = [wikifolio_id.encode("ascii") for wikifolio_id in wikifolio_ids]
+        cache = cls(shm, owner=True)
+        cache.slots[:] = np.zeros(len(wikifolio_ids), dtype=cls.slot_dtype)
+        return cache
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedPriceCache":
+        # only the creating process may unlink the block, readers must not hand it to their resource tracker
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            shm = shared_memory.SharedMemory(name=name)
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm, owner=False)
+
+    def publish(self, price: PriceInformation) -> None:
+        i = self.index[price.wikifolioId]
+        # convert everything first, so a bad value raises before the slot is marked as being written
+        record = np.zeros(1, dtype=self.slot_dtype)
+        for field in self.price_fields:
+            value = getattr(price, field)
+            record[field] = np.nan if value is None else float(value)
+        record["updated"] = time.time()
+        # odd while writing; an interrupted update left the slot odd already and is completed by this one
+        writing = int(self.slots["seq"][i]) | 1
+        record["seq"] = writing
+        self.slots["seq"][i] = writing
+        self.slots[i] = record[0]
+        # only marked consistent once the whole record is written, an interrupted copy stays odd
+        self.slots["seq"][i] = writing + 1
+
+    def read(self, wikifolio_id: str, timeout: float = 1.0) -> typing.Optional[typing.Dict[str, float]]:
+        """
+        Returns the latest published price fields plus `seq` and `updated` (unix time), None if there is none.
+        Raises TimeoutError if no consistent read succeeded within `timeout` seconds (e.g. the writer died
+        during an update).
+        """
+        i = self.index[wikifolio_id]
+        slots = self.slots
+        deadline = None
+        while True:
+            seq = slots["seq"][i]
+            if not seq & 1:
+                row = slots[i].copy()
+                if slots["seq"][i] == seq:
+                    break
+            if deadline is None:
+                deadline = time.monotonic() + timeout
+            elif time.monotonic() > deadline:
+                raise TimeoutError("SharedPriceCache.read -> No consistent price of {} within {} seconds".format(wikifolio_id, timeout))
+            time.sleep(0)
+        if seq == 0:
+            return None
+        return {field: row[field].item() for field in self.slot_dtype.names}
+
+    def seq(self, wikifolio_id: str) -> int:
+        return int(self.slots["seq"][self.index[wikifolio_id]])
+
+    def close(self) -> None:
+        self.ids = self.slots = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def serve(self, interval: float = 1.0, transport = None, max_workers: int = 4, stop: typing.Optional[typing.Callable[[], bool]] = None) -> None:
+        """
+        Daemon loop of the writer process: fetches the prices of all wikifolios every `interval` seconds
+        over the public endpoint and publishes them, until `stop()` returns True.
+        """
+        from wikifolio import PublicWikifolio
+        clients = [PublicWikifolio(wikifolio_id, transport) for wikifolio_id in self.index]
+
+        def update(client: PublicWikifolio) -> None:
+            try:
+                self.publish(client.get_price_information())
+            except Exception as e:
+                print("Error at SharedPriceCache.serve -> Could not update {}: {}".format(client.wikifolio_id, e))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while stop is None or not stop():
+                started = time.monotonic()
+                list(executor.map(update, clients))
+                time.sleep(max(0.0, interval - (time.monotonic() - started)))
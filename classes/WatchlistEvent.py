@@ -0,0 +1,9 @@
+from dataclasses import dataclass
+import typing
+
+@dataclass(frozen=True)
+class WatchlistEvent:
+    name: str
+    field: str
+    old: typing.Any
+    new: typing.Any
@@ -0,0 +1,172 @@
+import hashlib
+import heapq
+import time
+import typing
+from concurrent.futures import ThreadPoolExecutor
+
+from .WatchlistEvent import WatchlistEvent
+
+class WatchlistScanner:
+    """
+    Re-scrapes the pages of a universe of wikifolios with the session of one existing Wikifolio and reports
+    changes of ranking, performance and status fields.
+
+    A wikifolio with priority p is due `interval / p` seconds after its last scan, the most overdue are
+    scanned first. Per wikifolio only a hash of the page data and one compact row of the tracked fields are
+    kept; pages with an unchanged hash are not decoded at all. Numeric fields only produce an event if they
+    changed by more than their threshold since the last reported value.
+    """
+    # paths below props.pageProps.data of the tracked fields which are no key figures (see Wikifolio.key_figure_paths)
+    data_paths = {
+        "status": ("wikifolio", "status"),
+        "is_on_watchlist": ("wikifolio", "isOnWatchlist"),
+    }
+    tracked_fields = (
+        "ranking_place", "ranking_points", "watchlistings", "is_on_watchlist", "status",
+        "performance_intraday", "performance_one_month", "performance_ytd", "performance_one_year",
+        "performance_ever", "total_investments",
+    )
+
+    def __init__(
+            self,
+            client: "Wikifolio",
+            names: typing.Iterable[str] = (),
+            fields: typing.Optional[typing.Iterable[str]] = None,
+            thresholds: typing.Optional[typing.Dict[str, float]] = None,
+            interval: float = 900,
+            max_workers: int = 4
+    ) -> None:
+        self.client = client
+        self.fields = tuple(fields or self.tracked_fields)
+        self.thresholds = thresholds or {}
+        self.interval = interval
+        self.max_workers = max_workers
+        self.pages_scanned = 0
+        self.pages_unchanged = 0
+        self._priorities: typing.Dict[str, float] = {}
+        self._digests: typing.Dict[str, bytes] = {}
+        self._rows: typing.Dict[str, tuple] = {}
+        self._due: typing.Dict[str, float] = {}
+        self._scanned: typing.Dict[str, float] = {}
+        self._heap: typing.List[typing.Tuple[float, str]] = []
+        for name in names:
+            self.add(name)
+
+    def add(self, name: str, priority: float = 1.0) -> None:
+        """
+        Adds a wikifolio, due immediately. For one that is already added, only its priority is changed.
+        """
+        if name in self._due:
+            self.set_priority(name, priority)
+            return
+        self._priorities[name] = priority
+        self._schedule(name, time.monotonic())
+
+    def remove(self, name: str) -> None:
+        for table in (self._priorities, self._digests, self._rows, self._due, self._scanned):
+            table.pop(name, None)
+
+    def set_priority(self, name: str, priority: float) -> None:
+        """
+        Changes the priority and reschedules the wikifolio to `interval / priority` after its last scan.
+        """
+        self._priorities[name] = priority
+        if name in self._scanned:
+            self._schedule(name, self._scanned[name] + self.interval / priority)
+
+    def row(self, name: str) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        row = self._rows.get(name)
+        return None if row is None else dict(zip(self.fields, row))
+
+    def _schedule(self, name: str, due: float) -> None:
+        self._due[name] = due
+        heapq.heappush(self._heap, (due, name))
+
+    def _pop_due(self, now: float, limit: typing.Optional[int]) -> typing.List[str]:
+        names = []
+        while self._heap and self._heap[0][0] <= now and (limit is None or len(names) < limit):
+            due, name = heapq.heappop(self._heap)
+            # skip entries of removed or rescheduled wikifolios, and duplicates of the same due time
+            if self._due.get(name) == due and name not in names:
+                names.append(name)
+        return names
+
+    def _scan(self, name: str) -> typing.Tuple[typing.List[WatchlistEvent], bool]:
+        """
+        Returns the events of one wikifolio and whether its page was unchanged.
+        """
+        content = self.client._download_wikifolio_page(name)
+        next_data = self.client._next_data_slice(content)
+        digest = hashlib.blake2b(next_data if next_data is not None else content, digest_size=16).digest()
+        if self._digests.get(name) == digest:
+            return [], True
+        row = self._read_row(name, self.client._parse_wikifolio_page(content))
+        old_row = self._rows.get(name)
+        self._digests[name] = digest
+        if old_row is None:
+            self._rows[name] = row
+            return [], False
+        events = []
+        kept = []
+        for field, old, new in zip(self.fields, old_row, row):
+            numeric = isinstance(old, (int, float)) and isinstance(new, (int, float)) and not isinstance(new, bool)
+            if old == new or (numeric and abs(new - old) <= self.thresholds.get(field, 0.0)):
+                # small changes are measured against the last reported value, so drifts add up
+                kept.append(old)
+                continue
+            kept.append(new)
+            events.append(WatchlistEvent(name, field, old, new))
+        self._rows[name] = tuple(kept)
+        return events, False
+
+    def _read_row(self, name: str, raw_data: dict) -> tuple:
+        # fields are read straight from the page data, missing ones are None without an error message
+        data = raw_data["props"]["pageProps"]["data"]
+        wf = None
+        row = []
+        for field in self.fields:
+            path = self.data_paths.get(field) or self.client.key_figure_paths.get(field)
+            if path is not None:
+                row.append(self.client._resolve_path(data, path))
+                continue
+            if wf is None:
+                wf = self.client._from_raw_data(name, raw_data)
+            row.append(getattr(wf, field))
+        return tuple(row)
+
+    def scan_due(self, limit: typing.Optional[int] = None) -> typing.List[WatchlistEvent]:
+        """
+        Scans the wikifolios which are due (at most `limit`) concurrently and returns the events.
+        """
+        names = self._pop_due(time.monotonic(), limit)
+        events = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for name, result in zip(names, executor.map(self._try_scan, names)):
+                if name in self._priorities:
+                    self._scanned[name] = time.monotonic()
+                    self._schedule(name, self._scanned[name] + self.interval / self._priorities[name])
+                if result is None:
+                    continue
+                # counted here, not in the pool threads
+                self.pages_scanned += 1
+                if result[1]:
+                    self.pages_unchanged += 1
+                events.extend(result[0])
+        return events
+
+    def _try_scan(self, name: str) -> typing.Optional[typing.Tuple[typing.List[WatchlistEvent], bool]]:
+        try:
+            return self._scan(name)
+        except Exception as e:
+            print("Error at WatchlistScanner._scan -> Could not scan {}: {}".format(name, e))
+            return None
+
+    def run(self, batch_size: int = 50, idle: float = 1.0) -> typing.Iterator[WatchlistEvent]:
+        """
+        Scans due wikifolios in batches forever and yields their events.
+        """
+        while True:
+            events = self.scan_due(batch_size)
+            yield from events
+            if not self._heap or self._heap[0][0] > time.monotonic():
+                time.sleep(idle)
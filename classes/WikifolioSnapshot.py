@@ -0,0 +1,6 @@
+import typing
+
+class WikifolioSnapshot(typing.NamedTuple):
+    name: str
+    wikifolio_id: typing.Optional[str]
+    values: typing.Tuple[float, ...] # in the order of the requested metrics, nan if missing
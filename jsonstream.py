@@ -0,0 +1,108 @@
+import codecs
+import json
+import re
+import typing
+
+_WHITESPACE = re.compile(r"\s*")
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_SCALAR = re.compile(r"[^\s,:\[\]{}]+")
+_decoder = json.JSONDecoder()
+
+def _matches(path: tuple, pattern: tuple) -> bool:
+    if len(path) != len(pattern):
+        return False
+    for key, wanted in zip(path, pattern):
+        if wanted != "*" and key != wanted:
+            return False
+    return True
+
+def iter_array_items(chunks: typing.Iterable[bytes], path: typing.Tuple) -> typing.Iterator[typing.Any]:
+    """
+    Incrementally decodes a JSON document given as byte chunks and yields the items of every array found
+    at `path`, one at a time. Keys in `path` are object keys or array indices, "*" matches any of them,
+    e.g. ("groups", "*", "items"). Only the current item is held in memory, everything else is skipped
+    without being decoded.
+    """
+    chunks = iter(chunks)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    pos = 0
+    final = False
+    # one frame per open container: [is_object, current key or index, expecting a key]
+    stack: typing.List[list] = []
+
+    def refill() -> bool:
+        nonlocal buf, pos, final
+        if final:
+            return False
+        chunk = next(chunks, None)
+        if chunk is None:
+            buf = buf[pos:] + decoder.decode(b"", final=True)
+            final = True
+        else:
+            buf = buf[pos:] + decoder.decode(chunk)
+        pos = 0
+        return True
+
+    while True:
+        pos = _WHITESPACE.match(buf, pos).end()
+        if pos >= len(buf):
+            if not refill():
+                if stack:
+                    raise ValueError("Truncated JSON document")
+                return
+            continue
+        c = buf[pos]
+        top = stack[-1] if stack else None
+
+        if c == ",":
+            if top[0]:
+                top[2] = True
+            else:
+                top[1] += 1
+            pos += 1
+        elif c == ":":
+            pos += 1
+        elif c == "}" or c == "]":
+            stack.pop()
+            pos += 1
+        elif top is not None and top[0] and top[2]:
+            m = _STRING.match(buf, pos)
+            if m is None:
+                if not refill():
+                    raise ValueError("Truncated JSON object key")
+                continue
+            top[1] = json.loads(m.group())
+            top[2] = False
+            pos = m.end()
+        elif top is not None and not top[0] and _matches(tuple(frame[1] for frame in stack[:-1]), path):
+            if c in "{[\"":
+                try:
+                    item, end = _decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if refill():
+                        continue
+                    raise
+            else:
+                m = _SCALAR.match(buf, pos)
+                if m.end() == len(buf) and refill():
+                    # the number or literal might continue in the next chunk
+                    continue
+                item, end = json.loads(m.group()), m.end()
+            pos = end
+            yield item
+        elif c == "{":
+            stack.append([True, None, True])
+            pos += 1
+        elif c == "[":
+            stack.append([False, 0, False])
+            pos += 1
+        else:
+            m = (_STRING if c == '"' else _SCALAR).match(buf, pos)
+            if m is None or (m.end() == len(buf) and not final):
+                if not refill():
+                    if m is None:
+                        raise ValueError("Truncated JSON value")
+                    pos = m.end()
+                continue
+            pos = m.end()
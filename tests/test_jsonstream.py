@@ -0,0 +1,96 @@
+import json
+import random
+
+import pytest
+
+from jsonstream import iter_array_items
+
+DOCUMENT = {
+    "count": 3,
+    "note": "brackets ] } [ { and \"quotes\", commas, colons: inside strings",
+    "groups": [
+        {
+            "name": "Aktien äöü €",
+            "items": [
+                {"isin": "DE0007164600", "quantity": 12.5, "bid": -1.25e-3, "ok": True, "link": "a\\b\\\"c"},
+                {"isin": "US0378331005", "quantity": 0, "bid": None, "nested": {"items": [1, 2]}},
+            ],
+        },
+        {"name": "empty", "items": []},
+        {"name": "escaped \"items\"", "items": [{"isin": "😀 \\u0041", "quantity": 1234567890123}]},
+    ],
+    "orders": [1, -2.5, 3e10, "x", True, False, None, [], {}],
+}
+
+def expected_items(document, path):
+    nodes = [document]
+    for key in path:
+        if key == "*":
+            nodes = [child for node in nodes for child in (node.values() if isinstance(node, dict) else node)]
+        else:
+            nodes = [node[key] for node in nodes if isinstance(node, (dict, list))]
+    return [item for node in nodes for item in node]
+
+def split(data: bytes, sizes):
+    chunks = []
+    pos = 0
+    for size in sizes:
+        chunks.append(data[pos:pos + size])
+        pos += size
+    chunks.append(data[pos:])
+    return chunks
+
+def random_chunks(data: bytes, rng: random.Random):
+    cuts = sorted(rng.sample(range(1, len(data)), rng.randint(1, 40)))
+    return [data[start:end] for start, end in zip([0] + cuts, cuts + [len(data)])]
+
+@pytest.mark.parametrize("path", [("groups", "*", "items"), ("groups",), ("orders",), ("groups", 2, "items")])
+def test_whole_document(path):
+    data = json.dumps(DOCUMENT).encode("utf-8")
+    assert list(iter_array_items([data], path)) == expected_items(DOCUMENT, path)
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+@pytest.mark.parametrize("path", [("groups", "*", "items"), ("orders",)])
+def test_every_single_split(path, ensure_ascii):
+    # covers splits inside strings, escape sequences, multi-byte characters, numbers, literals and keys
+    data = json.dumps(DOCUMENT, ensure_ascii=ensure_ascii).encode("utf-8")
+    expected = expected_items(DOCUMENT, path)
+    for i in range(1, len(data)):
+        assert list(iter_array_items([data[:i], data[i:]], path)) == expected, i
+
+def test_random_splits():
+    rng = random.Random(29)
+    data = json.dumps(DOCUMENT, indent=2, ensure_ascii=False).encode("utf-8")
+    expected = expected_items(DOCUMENT, ("groups", "*", "items"))
+    for _ in range(300):
+        assert list(iter_array_items(random_chunks(data, rng), ("groups", "*", "items"))) == expected
+
+def test_one_byte_chunks():
+    data = json.dumps(DOCUMENT).encode("utf-8")
+    assert list(iter_array_items(split(data, [1] * len(data)), ("orders",))) == DOCUMENT["orders"]
+
+def test_number_split_at_chunk_boundary():
+    assert list(iter_array_items([b'{"a": [1', b'.25, 10', b'0]}'], ("a",))) == [1.25, 100]
+
+def test_top_level_array():
+    assert list(iter_array_items([b'[{"a": 1},', b' 2, "three"]'], ())) == [{"a": 1}, 2, "three"]
+
+def test_missing_path_yields_nothing():
+    assert list(iter_array_items([json.dumps(DOCUMENT).encode("utf-8")], ("missing", "*"))) == []
+
+def test_items_are_yielded_before_the_document_ends():
+    def chunks():
+        yield b'{"items": [{"a": 1}, '
+        raise AssertionError("first item not yielded before reading on")
+    assert next(iter_array_items(chunks(), ("items",))) == {"a": 1}
+
+@pytest.mark.parametrize("data", [
+    b'{"items": [{"a": 1}, {"b": ',
+    b'{"items": [{"a": "unterminated',
+    b'{"items": [1, 2',
+    b'{"items": [1, 2]',
+    b'{"ite',
+])
+def test_truncated_input_raises(data):
+    with pytest.raises(ValueError):
+        list(iter_array_items([data[:5], data[5:]], ("items",)))
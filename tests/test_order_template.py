@@ -0,0 +1,108 @@
+import json
+from urllib.parse import parse_qsl, urlencode
+
+import numpy as np
+import pytest
+
+from classes.OrderTemplate import OrderTemplate, is_valid_isin
+
+WIKIFOLIO_ID = "8d1a8a35-4c1e-4c9e-9d1a-0f2f2a7e5b11"
+ISIN = "DE0007164600"
+VALID_UNTIL = "2024-01-02T12:00:00.000000Z"
+
+def form(body: str) -> dict:
+    # what requests sends for a dict, so templates are compared with the dicts of the original methods
+    return dict(parse_qsl(body, keep_blank_values=True))
+
+def baseline_limit_order(buysell: str, amount, limit_price) -> dict:
+    return {
+        "amount": amount,
+        "buysell": buysell,
+        "limitPrice": limit_price,
+        "orderType": "limit",
+        "stopLossLimitPrice": "",
+        "stopLossStopPrice": "",
+        "stopPrice": 0,
+        "takeProfitLimitPrice": "",
+        "underlyingIsin": ISIN,
+        "validUntil": VALID_UNTIL,
+        "wikifolioId": WIKIFOLIO_ID,
+    }
+
+def baseline_quote_order(buysell: str, amount, quote_id: str) -> dict:
+    return {
+        "amount": amount,
+        "buysell": buysell,
+        "limitPrice": "",
+        "orderType": "quote",
+        "quoteId": quote_id,
+        "stopLossLimitPrice": "",
+        "stopLossStopPrice": "",
+        "stopPrice": "",
+        "takeProfitLimitPrice": "",
+        "underlyingIsin": ISIN,
+        "validUntil": "",
+        "wikifolioId": WIKIFOLIO_ID,
+    }
+
+@pytest.mark.parametrize("buysell", ["buy", "sell"])
+def test_limit_order_matches_baseline(buysell):
+    template = OrderTemplate(WIKIFOLIO_ID, ISIN, buysell)
+    body = template.encode(amount=3, limit_price=101.25, valid_until=VALID_UNTIL)
+    assert form(body) == form(urlencode(baseline_limit_order(buysell, 3, 101.25)))
+
+@pytest.mark.parametrize("buysell", ["buy", "sell"])
+def test_quote_order_matches_baseline(buysell):
+    template = OrderTemplate(WIKIFOLIO_ID, ISIN, buysell, "quote")
+    body = template.encode(amount=7, quote_id="a1b2c3")
+    assert form(body) == form(urlencode(baseline_quote_order(buysell, 7, "a1b2c3")))
+
+def test_limit_order_default_valid_until():
+    fields = form(OrderTemplate(WIKIFOLIO_ID, ISIN, "buy").encode(amount=1, limit_price=1.0))
+    assert fields["validUntil"].endswith("Z") and fields["validUntil"] == OrderTemplate.default_valid_until()
+
+@pytest.mark.parametrize("buysell, code", [("buy", 910), ("sell", 920)])
+def test_quote_request_matches_baseline(buysell, code):
+    template = OrderTemplate(WIKIFOLIO_ID, ISIN, buysell, "quote")
+    trade_data = {"H": "quotehub", "M": "GetQuote", "A": [WIKIFOLIO_ID, ISIN, "5", code], "I": 1}
+    assert json.loads(template.quote_request(5)) == trade_data
+    assert json.loads(template.quote_request(5, invocation_id=42))["I"] == 42
+
+def test_numpy_values():
+    template = OrderTemplate(WIKIFOLIO_ID, ISIN, "buy")
+    body = template.encode(amount=np.int64(3), limit_price=np.float32(1.5), valid_until=VALID_UNTIL)
+    assert form(body) == form(urlencode(baseline_limit_order("buy", 3, 1.5)))
+    assert json.loads(OrderTemplate(WIKIFOLIO_ID, ISIN, "buy", "quote").quote_request(np.int32(4)))["A"][2] == "4"
+
+@pytest.mark.parametrize("isin", ["DE0007164600", "US0378331005", "IE00B4L5Y983", "AU0000XVGZA3", "GB0002634946"])
+def test_valid_isins(isin):
+    assert is_valid_isin(isin)
+
+@pytest.mark.parametrize("isin", ["DE0007164601", "US0378331006", "de0007164600", "DE000716460", "DE00071646000", "", None, 123])
+def test_invalid_isins(isin):
+    assert not is_valid_isin(isin)
+    with pytest.raises(ValueError):
+        OrderTemplate(WIKIFOLIO_ID, isin, "buy")
+
+@pytest.mark.parametrize("amount", [0, -1, 1.5, True, "3", np.float64(2.0), None])
+def test_invalid_amounts(amount):
+    template = OrderTemplate(WIKIFOLIO_ID, ISIN, "buy", "quote")
+    with pytest.raises(ValueError):
+        template.quote_request(amount)
+    with pytest.raises(ValueError):
+        template.encode(amount=amount, quote_id="q")
+
+@pytest.mark.parametrize("price", [0, -1.0, float("nan"), True, "1.5", None])
+def test_invalid_limit_prices(price):
+    with pytest.raises(ValueError):
+        OrderTemplate(WIKIFOLIO_ID, ISIN, "sell").encode(amount=1, limit_price=price)
+
+def test_invalid_side_and_type():
+    with pytest.raises(ValueError):
+        OrderTemplate(WIKIFOLIO_ID, ISIN, "hold")
+    with pytest.raises(ValueError):
+        OrderTemplate(WIKIFOLIO_ID, ISIN, "buy", "market")
+
+def test_quote_order_needs_quote_id():
+    with pytest.raises(ValueError):
+        OrderTemplate(WIKIFOLIO_ID, ISIN, "buy", "quote").encode(amount=1)
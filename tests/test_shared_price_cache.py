@@ -0,0 +1,75 @@
+import sys
+import threading
+
+import pytest
+
+from classes.PriceInformation import PriceInformation
+from classes.SharedPriceCache import SharedPriceCache
+
+WIKIFOLIO_ID = "00000000-0000-0000-0000-000000000001"
+
+def make_price(value) -> PriceInformation:
+    return PriceInformation(
+        id="1", ask=value, bid=value, quantityLimitBid=1000, quantityLimitAsk=1000,
+        calculationDate="", validUntilDate="", wikifolioId=WIKIFOLIO_ID, isin="DE000LS9AAA0",
+        instrument="", midPrice=value, showMidPrice=True, currency="EUR", isCurrencyConverted=False,
+        isTicking=True,
+    )
+
+@pytest.fixture
+def cache():
+    cache = SharedPriceCache.create([WIKIFOLIO_ID])
+    yield cache
+    cache.close()
+
+def test_read_before_publish(cache):
+    assert cache.read(WIKIFOLIO_ID) is None
+
+def test_failed_publish_keeps_slot_readable(cache):
+    cache.publish(make_price(100.0))
+    with pytest.raises(ValueError):
+        cache.publish(make_price("not a number"))
+    assert cache.seq(WIKIFOLIO_ID) == 2
+    assert cache.read(WIKIFOLIO_ID, timeout=0.1)["bid"] == 100.0
+    cache.publish(make_price(101.0))
+    assert cache.seq(WIKIFOLIO_ID) == 4
+    assert cache.read(WIKIFOLIO_ID, timeout=0.1)["ask"] == 101.0
+
+def test_read_times_out_on_abandoned_update(cache):
+    cache.publish(make_price(100.0))
+    cache.slots["seq"][0] = 3 # writer died between marking and finishing the update
+    with pytest.raises(TimeoutError):
+        cache.read(WIKIFOLIO_ID, timeout=0.05)
+
+def test_reader_never_sees_torn_update(cache):
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    done = threading.Event()
+
+    def write() -> None:
+        for value in range(1, 20001):
+            cache.publish(make_price(float(value)))
+        done.set()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    reads = 0
+    try:
+        while not done.is_set():
+            row = cache.read(WIKIFOLIO_ID)
+            if row is not None:
+                assert row["bid"] == row["ask"] == row["midPrice"]
+                assert row["seq"] % 2 == 0
+                reads += 1
+    finally:
+        writer.join()
+        sys.setswitchinterval(switch_interval)
+    assert reads > 0
+    assert cache.read(WIKIFOLIO_ID)["bid"] == 20000.0
+
+def test_publish_after_abandoned_update_restores_parity(cache):
+    cache.publish(make_price(100.0))
+    cache.slots["seq"][0] = 3 # writer died between marking and finishing the update
+    cache.publish(make_price(101.0))
+    assert cache.seq(WIKIFOLIO_ID) == 4
+    assert cache.read(WIKIFOLIO_ID, timeout=0.1)["bid"] == 101.0
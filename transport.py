@@ -0,0 +1,266 @@
+"""
+Pluggable transport for all HTTP and SignalR traffic of a Wikifolio.
+
+Transport sends requests directly (requests / websocket-client). RecordingTransport additionally writes
+every request/response pair and every websocket session to a gzip compressed json lines file, which
+ReplayTransport serves again without network access, with the recorded timing scaled by `speed` and
+optional extra latency.
+
+    with RecordingTransport("session.jsonl.gz") as transport:
+        wf = Wikifolio(username, password, "wf000igb03", transport=transport)
+    wf = Wikifolio(username, password, "wf000igb03", transport=ReplayTransport("session.jsonl.gz", speed=None))
+"""
+import base64
+import collections
+import gzip
+import json
+import random
+import threading
+import time
+import typing
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from requests.cookies import cookiejar_from_dict
+from requests.structures import CaseInsensitiveDict
+
+if typing.TYPE_CHECKING:
+    import websocket
+
+# fields which change on every call (cache busters, tokens, timestamps) and are ignored when matching
+_VOLATILE_FIELDS = {"_", "connectionToken", "validUntil", "quoteId"}
+
+def _normalize_fields(fields) -> typing.List[typing.Tuple[str, str]]:
+    if fields is None:
+        return []
+    if isinstance(fields, bytes):
+        fields = fields.decode("utf-8", "replace")
+    if isinstance(fields, str):
+        pairs = parse_qsl(fields)
+    elif isinstance(fields, dict):
+        pairs = [(str(key), json.dumps(value, sort_keys=True) if isinstance(value, (list, dict)) else str(value)) for key, value in fields.items()]
+    else:
+        pairs = [(str(key), str(value)) for key, value in fields]
+    return sorted(pair for pair in pairs if pair[0] not in _VOLATILE_FIELDS)
+
+def request_key(method: str, url: str, params = None, data = None) -> str:
+    return json.dumps([method.upper(), url, _normalize_fields(params), _normalize_fields(data)])
+
+def _route_key(method: str, url: str) -> str:
+    return method.upper() + " " + urlsplit(url).path
+
+def _encode_body(body: bytes) -> typing.Tuple[str, str]:
+    # bodies are stored as text when possible, base64 only for binary data
+    try:
+        return "text", body.decode("utf-8")
+    except UnicodeDecodeError:
+        return "base64", base64.b64encode(body).decode("ascii")
+
+def _decode_body(encoding: str, body: str) -> bytes:
+    return body.encode("utf-8") if encoding == "text" else base64.b64decode(body)
+
+class Transport:
+    """
+    Sends the requests of a Wikifolio over the network.
+    """
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        return requests.request(method, url, **kwargs)
+
+    def websocket(self) -> "websocket.WebSocket":
+        import websocket
+        return websocket.WebSocket()
+
+class RecordingTransport(Transport):
+    """
+    Forwards everything to `inner` (default: the network) and appends each exchange to `path`, as one gzip
+    stream which is completed by close() (or leaving the with block).
+    """
+
+    def __init__(self, path: str, inner: typing.Optional[Transport] = None) -> None:
+        self.path = path
+        self.inner = inner or Transport()
+        self._lock = threading.Lock()
+        self._file: typing.Optional[gzip.GzipFile] = None
+
+    def write(self, record: dict) -> None:
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            if self._file is None:
+                self._file = gzip.GzipFile(self.path, "ab")
+            self._file.write(line)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self) -> "RecordingTransport":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        started = time.monotonic()
+        r = self.inner.request(method, url, **kwargs)
+        encoding, body = _encode_body(r.content) # also reads streamed responses, iter_content then serves the cached body
+        self.write({
+            "type": "http",
+            "key": request_key(method, url, kwargs.get("params"), kwargs.get("data")),
+            "route": _route_key(method, url),
+            "status": r.status_code,
+            "reason": r.reason,
+            "headers": dict(r.headers),
+            "cookies": r.cookies.get_dict(),
+            "encoding": encoding,
+            "body": body,
+            "elapsed": time.monotonic() - started,
+        })
+        return r
+
+    def websocket(self) -> "RecordingWebSocket":
+        return RecordingWebSocket(self.inner.websocket(), self)
+
+class RecordingWebSocket:
+    """
+    Wraps a websocket and records the session (sent messages and received frames) when it is closed.
+    """
+
+    def __init__(self, ws, transport: RecordingTransport) -> None:
+        self.ws = ws
+        self.transport = transport
+        self.url = None
+        self.events = []
+        self._last = time.monotonic()
+
+    def _elapsed(self) -> float:
+        now = time.monotonic()
+        elapsed, self._last = now - self._last, now
+        return elapsed
+
+    def connect(self, url: str, **options) -> None:
+        self.ws.connect(url, **options)
+        self.url = url
+        self._elapsed()
+
+    def settimeout(self, timeout) -> None:
+        self.ws.settimeout(timeout)
+
+    def send(self, payload) -> None:
+        self.ws.send(payload)
+        self.events.append(["send", payload, self._elapsed()])
+
+    def recv_data(self, control_frame: bool = False):
+        opcode, data = self.ws.recv_data(control_frame)
+        encoding, body = _encode_body(data)
+        self.events.append(["recv", opcode, body, self._elapsed(), encoding])
+        return opcode, data
+
+    def close(self, **options) -> None:
+        self.ws.close(**options)
+        if self.url is not None:
+            self.transport.write({"type": "ws", "route": urlsplit(self.url).path, "events": self.events})
+            self.url = None
+
+class ReplayTransport(Transport):
+    """
+    Serves recorded exchanges. Requests are matched by method, URL and fields (ignoring volatile fields),
+    then by method and URL path only. Recordings of a key are served in order and start over when
+    exhausted if `loop` is set.
+
+    Each response is delayed by its recorded duration divided by `speed` (None: no recorded delay) plus
+    `latency` and a random `jitter` in seconds.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            speed: typing.Optional[float] = 1.0,
+            latency: float = 0.0,
+            jitter: float = 0.0,
+            loop: bool = True
+    ) -> None:
+        self.speed = speed
+        self.latency = latency
+        self.jitter = jitter
+        self.loop = loop
+        self._by_key = collections.defaultdict(list)
+        self._by_route = collections.defaultdict(list)
+        self._sessions = collections.defaultdict(list)
+        self._positions = collections.Counter()
+        self._lock = threading.Lock()
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if record["type"] == "http":
+                    self._by_key[record["key"]].append(record)
+                    self._by_route[record["route"]].append(record)
+                else:
+                    self._sessions[record["route"]].append(record)
+
+    def delay(self, elapsed: float) -> None:
+        seconds = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if self.speed:
+            seconds += elapsed / self.speed
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def _next(self, table: dict, key: str):
+        with self._lock:
+            records = table.get(key)
+            position = self._positions[(id(table), key)]
+            if not records or (position >= len(records) and not self.loop):
+                return None
+            self._positions[(id(table), key)] = position + 1
+            return records[position % len(records)]
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        record = self._next(self._by_key, request_key(method, url, kwargs.get("params"), kwargs.get("data")))
+        if record is None:
+            record = self._next(self._by_route, _route_key(method, url))
+        if record is None:
+            raise KeyError("No recorded response for {} {}".format(method.upper(), url))
+        self.delay(record["elapsed"])
+        r = requests.Response()
+        r.status_code = record["status"]
+        r.reason = record["reason"]
+        r.headers = CaseInsensitiveDict(record["headers"])
+        r.cookies = cookiejar_from_dict(record["cookies"])
+        r._content = _decode_body(record.get("encoding", "base64"), record["body"])
+        r._content_consumed = True
+        r.url = url
+        r.encoding = requests.utils.get_encoding_from_headers(r.headers)
+        return r
+
+    def websocket(self) -> "ReplayWebSocket":
+        return ReplayWebSocket(self)
+
+class ReplayWebSocket:
+    def __init__(self, transport: ReplayTransport) -> None:
+        self.transport = transport
+        self.frames = collections.deque()
+
+    def connect(self, url: str, **options) -> None:
+        session = self.transport._next(self.transport._sessions, urlsplit(url).path)
+        if session is None:
+            raise KeyError("No recorded websocket session for {}".format(url))
+        self.frames = collections.deque(event for event in session["events"] if event[0] == "recv")
+
+    def settimeout(self, timeout) -> None:
+        pass
+
+    def send(self, payload) -> None:
+        pass
+
+    def recv_data(self, control_frame: bool = False):
+        if not self.frames:
+            import websocket
+            raise websocket.WebSocketConnectionClosedException("Recorded websocket session has no more frames")
+        event = self.frames.popleft()
+        self.transport.delay(event[3])
+        return event[1], _decode_body(event[4] if len(event) > 4 else "base64", event[2])
+
+    def close(self, **options) -> None:
+        self.frames.clear()
@@ -1,12 +1,16 @@
-import requests
-from requests.structures import CaseInsensitiveDict
-from lxml import etree, html
 import json
 import typing
-from datetime import datetime, timedelta
-import websocket
 import time
-from pyotp import TOTP
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import requests
+
+# lxml, websocket-client, pyotp and numpy are imported where they are needed, so short-lived processes
+# which only read prices don't pay for loading them
+if typing.TYPE_CHECKING:
+    import websocket
+    from classes.KeyFigureTable import KeyFigureTable
+    from classes.PriceHistory import PriceHistory
+    from classes.ChartCache import ChartCache
 
 from classes.ExecutionStatusResponse import ExecutionStatusResponse
 from classes.Order import Order
@@ -17,21 +21,182 @@ from classes.PortfolioUnderlying import PortfolioUnderlying
 from classes.Trader import Trader
 from classes.PriceInformation import PriceInformation
 from classes.PortfolioDetail import PortfolioDetail
+from classes.WikifolioSnapshot import WikifolioSnapshot
+from classes.OrderTemplate import OrderTemplate
+from classes.CancelResult import CancelResult
+from classes.CircuitBreaker import CircuitBreaker, CircuitOpenError
+from jsonstream import iter_array_items
+from transport import Transport
+
+class PublicWikifolio:
+    """
+    Read-only client for the public endpoints of a wikifolio, needs neither a login nor the wikifolio page.
+    """
+    wikifolio_id = None
+    transport = Transport()
+    _last_prices = None
+
+    def __init__(self, wikifolio_id: str, transport: typing.Optional[Transport] = None) -> None:
+        self.wikifolio_id = wikifolio_id
+        if transport is not None:
+            self.transport = transport
+
+    def get_content(self) -> Portfolio:
+        header = {
+            "accept": "application/json",
+        }
+        params = {
+            "includeportfolio": True,
+            "country": "de",
+            "language": "de",
+        }
+        r = self.transport.request(
+            "GET",
+            "https://www.wikifolio.com/api/chart/{}/data".format(self.wikifolio_id),
+            params=params,
+            headers=header,
+        )
+        r.raise_for_status()
+        raw_json = r.json()
+        portfolio = raw_json["portfolio"]
+        return Portfolio(**portfolio)
+
+    def get_price_history(self, cache: typing.Optional["ChartCache"] = None) -> "PriceHistory":
+        """
+        Returns the price history of the wikifolio from the chart endpoint as NumPy arrays. With a cache
+        the download is conditional (ETag / Last-Modified) and only points newer than the cached ones are
+        appended, the result is then memory mapped from the cache file.
+        """
+        header = {
+            "accept": "application/json",
+        }
+        params = {
+            "includeportfolio": False,
+            "country": "de",
+            "language": "de",
+        }
+        # without cached points a 304 would leave us with nothing, so only ask conditionally if there are some
+        validators = cache.get_validators(self.wikifolio_id) if cache and cache.last_timestamp(self.wikifolio_id) is not None else {}
+        if "etag" in validators:
+            header["If-None-Match"] = validators["etag"]
+        if "last_modified" in validators:
+            header["If-Modified-Since"] = validators["last_modified"]
+        r = self.transport.request(
+            "GET",
+            "https://www.wikifolio.com/api/chart/{}/data".format(self.wikifolio_id),
+            params=params,
+            headers=header,
+        )
+        if r.status_code == 304 and cache:
+            return cache.load(self.wikifolio_id)
+        r.raise_for_status()
+        from classes.PriceHistory import PriceHistory
+        history = PriceHistory.from_chart_data(r.json())
+        if not cache:
+            return history
+        cache.append(self.wikifolio_id, history)
+        validators = {}
+        if "ETag" in r.headers:
+            validators["etag"] = r.headers["ETag"]
+        if "Last-Modified" in r.headers:
+            validators["last_modified"] = r.headers["Last-Modified"]
+        cache.set_validators(self.wikifolio_id, validators)
+        return cache.load(self.wikifolio_id)
+
+    def get_price_information(self) -> PriceInformation:
+        headers = {"Accept": "application/json"}
+        params = {"country": "de", "language": "de"}
+        r = self.transport.request(
+            "GET",
+            "https://www.wikifolio.com/api/wikifolio/{}/price".format(self.wikifolio_id),
+            params = params,
+            headers = headers
+        )
+        r.raise_for_status()
+        price = PriceInformation(**r.json())
+        self._remember_price(price.isin, price.bid, price.ask)
+        return price
+
+    def _remember_price(self, isin: str, bid: typing.Optional[float], ask: typing.Optional[float]) -> None:
+        if self._last_prices is None:
+            self._last_prices = {}
+        self._last_prices[isin] = (bid, ask)
 
-class Wikifolio:
+class Wikifolio(PublicWikifolio):
     cookie = None
     name = None
-    wikifolio_id = None
     rawData = None
     twoFA_key = None
-
-    def __init__(self, username: str, password: str, wikifolio_name: str, twoFA_key = None) -> None:
+    _order_templates = None
+    _breakers = None
+    quote_fallback = False
+
+    # paths below props.pageProps.data of the numeric properties which are read by get_key_figure_table,
+    # resolved directly so missing figures (e.g. no 3y/5y figures of young wikifolios) are just nan
+    key_figure_paths = {
+        "performance_since_emission": ("keyFigures", "kpis", 2, "rankings", 1, "ranking", "value"),
+        "performance_ever": ("keyFigures", "kpis", 2, "rankings", 0, "ranking", "value"),
+        "performance_one_year": ("keyFigures", "kpis", 0, "rankings", 3, "ranking", "value"),
+        "volatility_one_year": ("keyFigures", "kpis", 0, "rankings", 7, "ranking", "value"),
+        "performance_ytd": ("keyFigures", "kpis", 2, "rankings", 2, "ranking", "value"),
+        "performance_annualized_ever": ("keyFigures", "kpis", 0, "rankings", 0, "ranking", "value"),
+        "performance_annualized_five_years": ("keyFigures", "kpis", 0, "rankings", 1, "ranking", "value"),
+        "performance_annualized_three_years": ("keyFigures", "kpis", 0, "rankings", 2, "ranking", "value"),
+        "volatility_annualized_ever": ("keyFigures", "kpis", 0, "rankings", 4, "ranking", "value"),
+        "volatility_annualized_five_years": ("keyFigures", "kpis", 0, "rankings", 5, "ranking", "value"),
+        "volatility_annualized_three_years": ("keyFigures", "kpis", 0, "rankings", 6, "ranking", "value"),
+        "performance_seven_days": ("keyFigures", "kpis", 2, "rankings", 7, "ranking", "value"),
+        "performance_one_month": ("keyFigures", "kpis", 2, "rankings", 6, "ranking", "value"),
+        "performance_three_months": ("keyFigures", "kpis", 2, "rankings", 5, "ranking", "value"),
+        "performance_six_months": ("keyFigures", "kpis", 2, "rankings", 4, "ranking", "value"),
+        "performance_intraday": ("keyFigures", "kpis", 2, "rankings", 3, "ranking", "value"),
+        "max_loss_ever": ("keyFigures", "otherKeyRiskIndicators", 0, "rankings", 0, "ranking", "value"),
+        "risk_ever": ("keyFigures", "otherKeyRiskIndicators", 0, "rankings", 1, "ranking", "value"),
+        "sharp_ratio_ever": ("keyFigures", "otherKeyRiskIndicators", 0, "rankings", 2, "ranking", "value"),
+        "sortino_ratio_ever": ("keyFigures", "otherKeyRiskIndicators", 0, "rankings", 3, "ranking", "value"),
+        "max_loss_five_years": ("keyFigures", "otherKeyRiskIndicators", 1, "rankings", 0, "ranking", "value"),
+        "risk_five_years": ("keyFigures", "otherKeyRiskIndicators", 1, "rankings", 1, "ranking", "value"),
+        "sharp_ratio_five_years": ("keyFigures", "otherKeyRiskIndicators", 1, "rankings", 2, "ranking", "value"),
+        "sortino_ratio_five_years": ("keyFigures", "otherKeyRiskIndicators", 1, "rankings", 3, "ranking", "value"),
+        "max_loss_three_years": ("keyFigures", "otherKeyRiskIndicators", 2, "rankings", 0, "ranking", "value"),
+        "risk_three_years": ("keyFigures", "otherKeyRiskIndicators", 2, "rankings", 1, "ranking", "value"),
+        "sharp_ratio_three_years": ("keyFigures", "otherKeyRiskIndicators", 2, "rankings", 2, "ranking", "value"),
+        "sortino_ratio_three_years": ("keyFigures", "otherKeyRiskIndicators", 2, "rankings", 3, "ranking", "value"),
+        "max_loss_one_year": ("keyFigures", "otherKeyRiskIndicators", 3, "rankings", 0, "ranking", "value"),
+        "risk_one_year": ("keyFigures", "otherKeyRiskIndicators", 3, "rankings", 1, "ranking", "value"),
+        "sharp_ratio_one_year": ("keyFigures", "otherKeyRiskIndicators", 3, "rankings", 2, "ranking", "value"),
+        "sortino_ratio_one_year": ("keyFigures", "otherKeyRiskIndicators", 3, "rankings", 3, "ranking", "value"),
+        "ranking_place": ("keyFigures", "kpis", 1, "rankings", 0, "ranking", "place"),
+        "ranking_points": ("keyFigures", "kpis", 1, "rankings", 0, "ranking", "value"),
+        "watchlistings": ("keyFigures", "kpis", 1, "rankings", 1, "ranking", "value"),
+        "total_investments": ("keyFigures", "totalInvestments", "ranking", "value"),
+        "liquidation_figure": ("keyFigures", "liquidationFigure", "ranking", "value"),
+        "trading_volume": ("keyFigures", "tradingVolume", "ranking", "value"),
+        "daily_fee": ("wikifolio", "dailyFee"),
+        "performance_fee": ("wikifolio", "performanceFee"),
+    }
+    key_figure_names = tuple(key_figure_paths)
+
+    def __init__(
+            self,
+            username: str,
+            password: str,
+            wikifolio_name: str,
+            twoFA_key = None,
+            transport: typing.Optional[Transport] = None,
+            quote_fallback: bool = False
+    ) -> None:
+        if transport is not None:
+            self.transport = transport
+        # place limit orders at the last known ask/bid while the quote circuit breaker is open
+        self.quote_fallback = quote_fallback
         params = {
             "email": username,
             "password": password,
             "keepLoggedIn": True
         }
-        r = requests.post(
+        r = self.transport.request(
+            "POST",
             "https://www.wikifolio.com/api/login?country=de&language=de",
             data=params,
         )
@@ -41,20 +206,72 @@ class Wikifolio:
         self._get_wikifolio_id(wikifolio_name)
         self.twoFA_key = twoFA_key
 
-    def _get_wikifolio_id(self, name: str) -> None:
-        r = requests.get(
+    def _download_wikifolio_page(self, name: str) -> bytes:
+        r = self.transport.request(
+            "GET",
             "https://www.wikifolio.com/de/de/w/{}".format(name),
             cookies=self.cookie,
         )
         r.raise_for_status()
-        save_text = r.text.replace ('&', '&amp;')
-        # html = etree.fromstring(save_text)
-        html2 = html.fromstring(save_text)
-        # html = etree.fromstring(r.text)
-        result = json.loads(html2.xpath('//*[@id="__NEXT_DATA__"]/text()')[0])
+        return r.content
+
+    @staticmethod
+    def _parse_wikifolio_page(content: bytes) -> dict:
+        """
+        Decodes the __NEXT_DATA__ json of a wikifolio page. The script tag is located directly in the raw
+        bytes and only its content is decoded; building the lxml DOM is the fallback for unexpected markup.
+        """
+        next_data = Wikifolio._next_data_slice(content)
+        if next_data is not None:
+            try:
+                return json.loads(next_data)
+            except ValueError:
+                pass
+        return Wikifolio._parse_wikifolio_page_lxml(content)
+
+    @staticmethod
+    def _next_data_slice(content: bytes) -> typing.Optional[bytes]:
+        """
+        Returns the raw content of the __NEXT_DATA__ script tag, None if it can't be found.
+        """
+        start = content.find(b'id="__NEXT_DATA__"')
+        if start == -1:
+            return None
+        start = content.find(b">", start) + 1
+        end = content.find(b"</script>", start)
+        if start == 0 or end == -1:
+            return None
+        return content[start:end]
+
+    @staticmethod
+    def _parse_wikifolio_page_lxml(content: bytes) -> dict:
+        # the html parser keeps script content as is, escaping '&' here would change the json strings
+        from lxml import html
+        html2 = html.fromstring(content.decode("utf-8"))
+        return json.loads(html2.xpath('//*[@id="__NEXT_DATA__"]/text()')[0])
+
+    def _fetch_wikifolio_page(self, name: str) -> dict:
+        return self._parse_wikifolio_page(self._download_wikifolio_page(name))
+
+    def _get_wikifolio_id(self, name: str) -> None:
+        result = self._fetch_wikifolio_page(name)
         self.wikifolio_id = result["props"]["pageProps"]["data"]["wikifolio"]["id"]
         self.rawData = result
 
+    @classmethod
+    def _from_raw_data(cls, name: str, raw_data: dict, cookie = None, transport: typing.Optional[Transport] = None) -> "Wikifolio":
+        """
+        Builds a Wikifolio from already loaded page data, without logging in again.
+        """
+        wf = cls.__new__(cls)
+        wf.cookie = cookie
+        if transport is not None:
+            wf.transport = transport
+        wf.name = name
+        wf.wikifolio_id = raw_data["props"]["pageProps"]["data"]["wikifolio"]["id"]
+        wf.rawData = raw_data
+        return wf
+
     def _get_wikifolio_key_figure(self, metric, submetric = 0, section = "kpis") -> typing.Optional[float]:
         try:
             key_figures = self.rawData["props"]["pageProps"]["data"]["keyFigures"]
@@ -548,6 +765,141 @@ class Wikifolio:
             tags.append(tag["label"])
         return tags
 
+    def get_key_figure_table(
+            self,
+            names: typing.List[str],
+            metrics: typing.Optional[typing.List[str]] = None,
+            max_workers: int = 4
+    ) -> "KeyFigureTable":
+        """
+        Loads the pages of the given wikifolios concurrently and returns their key figures as one
+        (wikifolios x metrics) float array. Missing figures and pages which could not be loaded are nan.
+        """
+        metrics = list(metrics or self.key_figure_names)
+
+        def load_row(name: str) -> typing.List[float]:
+            try:
+                wf = self._from_raw_data(name, self._fetch_wikifolio_page(name), self.cookie, self.transport)
+            except Exception as e:
+                print("Error at get_key_figure_table -> Could not load {}: {}".format(name, e))
+                return [float("nan")] * len(metrics)
+            return wf._key_figure_row(metrics)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            rows = list(executor.map(load_row, names))
+        import numpy as np
+        from classes.KeyFigureTable import KeyFigureTable
+        values = np.array(rows, dtype=np.float64).reshape(len(names), len(metrics))
+        return KeyFigureTable(values, list(names), metrics)
+
+    def _key_figure_row(self, metrics: typing.List[str]) -> typing.List[float]:
+        data = self.rawData["props"]["pageProps"]["data"]
+        row = []
+        for metric in metrics:
+            path = self.key_figure_paths.get(metric)
+            value = getattr(self, metric) if path is None else self._resolve_path(data, path)
+            row.append(value if isinstance(value, (int, float)) else float("nan"))
+        return row
+
+    @staticmethod
+    def _resolve_path(data, path: typing.Iterable) -> typing.Any:
+        """
+        Follows `path` (keys and list indices) into the page data, None if it doesn't exist.
+        """
+        for key in path:
+            try:
+                data = data[key]
+            except (KeyError, IndexError, TypeError):
+                return None
+        return data
+
+    def get_snapshots(
+            self,
+            names: typing.List[str],
+            metrics: typing.Optional[typing.List[str]] = None,
+            download_workers: int = 4,
+            processes: typing.Optional[int] = None
+    ) -> typing.List[typing.Optional[WikifolioSnapshot]]:
+        """
+        Like get_key_figure_table, but the pages are parsed in a pool of `processes` worker processes
+        (default: one per core) while further pages are downloaded, so parsing is not limited by the GIL.
+        Only compact WikifolioSnapshot objects are sent back. The result is in the order of `names`,
+        None for pages which could not be loaded. Use KeyFigureTable.from_snapshots to get one array.
+        """
+        metrics = list(metrics or self.key_figure_names)
+        snapshots: typing.List[typing.Optional[WikifolioSnapshot]] = [None] * len(names)
+        with ThreadPoolExecutor(max_workers=download_workers) as downloads, ProcessPoolExecutor(max_workers=processes) as parsers:
+            download_futures = {downloads.submit(self._download_wikifolio_page, name): i for i, name in enumerate(names)}
+            parse_futures = {}
+            for future in as_completed(download_futures):
+                i = download_futures[future]
+                try:
+                    content = future.result()
+                except Exception as e:
+                    print("Error at get_snapshots -> Could not load {}: {}".format(names[i], e))
+                    continue
+                parse_futures[parsers.submit(_snapshot_from_page, names[i], content, metrics)] = i
+            for future in as_completed(parse_futures):
+                i = parse_futures[future]
+                try:
+                    snapshots[i] = future.result()
+                except Exception as e:
+                    print("Error at get_snapshots -> Could not parse {}: {}".format(names[i], e))
+        return snapshots
+
+    def order_template(
+            self,
+            isin: str,
+            buysell: str,
+            order_type: str = "limit",
+            amount: typing.Optional[int] = None
+    ) -> OrderTemplate:
+        """
+        Returns the (cached) validated order template for this wikifolio, raises ValueError for invalid input.
+        """
+        if self._order_templates is None:
+            self._order_templates = {}
+        key = (isin, buysell, order_type, amount)
+        template = self._order_templates.get(key)
+        if template is None:
+            template = OrderTemplate(self.wikifolio_id, isin, buysell, order_type, amount)
+            self._order_templates[key] = template
+        return template
+
+    def place_order(self, template: OrderTemplate, cookies = None, **fields) -> OrderResponse:
+        """
+        Submits an order from a template, `fields` are the variable fields of OrderTemplate.encode
+        (amount, limit_price, stop_price, valid_until, quote_id, stop_loss_stop_price, ...).
+        """
+        return OrderResponse(**self.circuit_breaker("order").call(self._post_order, template.encode(**fields), cookies))
+
+    def _post_order(self, body: str, cookies = None) -> dict:
+        r = self.transport.request(
+            "POST",
+            "https://www.wikifolio.com/api/virtualorder/placeorder",
+            data=body,
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            cookies=cookies or self.cookie,
+            timeout=self._call_timeout("order"),
+        )
+        r.raise_for_status()
+        return r.json()
+
+    def circuit_breaker(self, family: str, **settings) -> CircuitBreaker:
+        """
+        Returns the circuit breaker of an endpoint family ("order": placeorder, "quote": SignalR quotes).
+        Passing settings (see CircuitBreaker) replaces it with a new one.
+        """
+        if self._breakers is None:
+            self._breakers = {}
+        if settings or family not in self._breakers:
+            self._breakers[family] = CircuitBreaker(family, **settings)
+        return self._breakers[family]
+
+    def _call_timeout(self, family: str) -> float:
+        # calls slower than slow_call_duration still finish and count as slow, hung ones fail at twice that
+        return 2 * self.circuit_breaker(family).slow_call_duration
+
     def buy_limit(
             self,
             amount: int,
@@ -555,33 +907,7 @@ class Wikifolio:
             limit_price: float,
             valid_until: typing.Optional[str] = None
     ) -> OrderResponse:
-        if not valid_until:
-            valid_until = datetime.strftime(
-                datetime.now() + timedelta(days=1), "%Y-%m-%dT%X.%fZ"
-            )
-        
-        params = {
-            "amount": amount,
-            "buysell": "buy",
-            "limitPrice": limit_price,
-            "orderType": "limit",
-            "stopLossLimitPrice": "",
-            "stopLossStopPrice": "",
-            "stopPrice": 0,
-            "takeProfitLimitPrice": "",
-            "underlyingIsin": isin,
-            "validUntil": valid_until,
-            "wikifolioId": self.wikifolio_id,
-        }
-        r = requests.post(
-            "https://www.wikifolio.com/api/virtualorder/placeorder",
-            data=params,
-            cookies=self.cookie,
-        )
-        r.raise_for_status()
-        # print(r.json())
-        raw_json = r.json()
-        return OrderResponse(**raw_json)
+        return self.place_order(self.order_template(isin, "buy"), amount=amount, limit_price=limit_price, valid_until=valid_until)
 
     def sell_limit(
             self,
@@ -590,38 +916,14 @@ class Wikifolio:
             limit_price: float,
             valid_until: typing.Optional[str] = None
     ) -> OrderResponse:
-        if not valid_until:
-            valid_until = datetime.strftime(
-                datetime.now() + timedelta(days=1), "%Y-%m-%dT%X.%fZ"
-            )
-        params = {
-            "amount": amount,
-            "buysell": "sell",
-            "limitPrice": limit_price,
-            "orderType": "limit",
-            "stopLossLimitPrice": "",
-            "stopLossStopPrice": "",
-            "stopPrice": 0,
-            "takeProfitLimitPrice": "",
-            "underlyingIsin": isin,
-            "validUntil": valid_until,
-            "wikifolioId": self.wikifolio_id,
-        }
-        r = requests.post(
-            "https://www.wikifolio.com/api/virtualorder/placeorder",
-            data=params,
-            cookies=self.cookie,
-        )
-        r.raise_for_status()
-        raw_json = r.json()
-        # print(r.json())
-        return OrderResponse(**raw_json)
+        return self.place_order(self.order_template(isin, "sell"), amount=amount, limit_price=limit_price, valid_until=valid_until)
 
     def trade_execution_status(self, order_uuid: str) -> ExecutionStatusResponse:
         params = {
             "order": order_uuid,
         }
-        r = requests.get(
+        r = self.transport.request(
+            "GET",
             "https://www.wikifolio.com/api/virtualorder/tradeexecutionstatus",
             params=params,
             cookies=self.cookie,
@@ -635,7 +937,8 @@ class Wikifolio:
             "term": term,
             "wikifolio": self.wikifolio_id,
         }
-        r = requests.post(
+        r = self.transport.request(
+            "POST",
             "https://www.wikifolio.com/dynamic/de/de/publish/autocompleteunderlyings",
             data=params,
             cookies=self.cookie,
@@ -644,26 +947,55 @@ class Wikifolio:
         raw_json = r.json()
         return [SearchResult(**raw_search_result) for raw_search_result in raw_json]
 
-    def get_content(self) -> Portfolio:
+    def get_trade_history(self, page: int = 0, page_size: int = 10) -> typing.List[Order]:
         header = {
             "accept": "application/json",
         }
         params = {
-            "includeportfolio": True,
+            "page": page,
+            "pagesize": page_size,
             "country": "de",
             "language": "de",
         }
-        r = requests.get(
-            "https://www.wikifolio.com/api/chart/{}/data".format(self.wikifolio_id),
+        r = self.transport.request(
+            "GET",
+            "https://www.wikifolio.com/api/wikifolio/{}/tradehistory".format(self.wikifolio_id),
             params=params,
             headers=header,
+            cookies=self.cookie,
         )
         r.raise_for_status()
         raw_json = r.json()
-        portfolio = raw_json["portfolio"]
-        return Portfolio(**portfolio)
+        orders = raw_json["tradeHistory"]["orders"]
+        return [Order(**raw_order) for raw_order in orders]
+    
+    def get_portfolio_details(self) -> typing.List[PortfolioDetail]:
+        header = {
+            "accept": "application/json",
+        }
+        params = {
+            "country": "de",
+            "language": "de",
+        }
+        r = self.transport.request(
+            "GET",
+            "https://www.wikifolio.com/api/wikifolio/{}/portfolio".format(self.name),
+            params=params,
+            headers=header,
+            cookies=self.cookie,
+        )
+        r.raise_for_status()
+        raw_json = r.json()
+        details = [PortfolioDetail(**raw_detail) for raw_detail in raw_json['groups'][0]['items']]
+        for detail in details:
+            self._remember_price(detail.isin, detail.bid, detail.ask)
+        return details
 
-    def get_trade_history(self, page: int = 0, page_size: int = 10) -> typing.List[Order]:
+    def iter_trade_history(self, page: int = 0, page_size: int = 10) -> typing.Iterator[Order]:
+        """
+        Like get_trade_history, but decodes the response while it is downloaded and yields the orders one
+        at a time, so memory stays flat for large page sizes.
+        """
         header = {
             "accept": "application/json",
         }
@@ -673,18 +1005,49 @@ class Wikifolio:
             "country": "de",
             "language": "de",
         }
-        r = requests.get(
+        r = self.transport.request(
+            "GET",
             "https://www.wikifolio.com/api/wikifolio/{}/tradehistory".format(self.wikifolio_id),
             params=params,
             headers=header,
             cookies=self.cookie,
+            stream=True,
         )
-        r.raise_for_status()
-        raw_json = r.json()
-        orders = raw_json["tradeHistory"]["orders"]
-        return [Order(**raw_order) for raw_order in orders]
-    
-    def get_portfolio_details(self) -> typing.List[PortfolioDetail]:
+        with r:
+            r.raise_for_status()
+            for raw_order in iter_array_items(r.iter_content(chunk_size=65536), ("tradeHistory", "orders")):
+                yield Order(**raw_order)
+
+    def iter_portfolio_details(self) -> typing.Iterator[PortfolioDetail]:
+        """
+        Streams the positions of all portfolio groups one at a time, see iter_trade_history.
+        """
+        header = {
+            "accept": "application/json",
+        }
+        params = {
+            "country": "de",
+            "language": "de",
+        }
+        r = self.transport.request(
+            "GET",
+            "https://www.wikifolio.com/api/wikifolio/{}/portfolio".format(self.name),
+            params=params,
+            headers=header,
+            cookies=self.cookie,
+            stream=True,
+        )
+        with r:
+            r.raise_for_status()
+            for raw_detail in iter_array_items(r.iter_content(chunk_size=65536), ("groups", "*", "items")):
+                detail = PortfolioDetail(**raw_detail)
+                self._remember_price(detail.isin, detail.bid, detail.ask)
+                yield detail
+
+    def _get_portfolio_items(self) -> typing.List[dict]:
+        """
+        Returns the raw position dicts of all portfolio groups, without building PortfolioDetail objects.
+        """
         header = {
             "accept": "application/json",
         }
@@ -692,196 +1055,127 @@ class Wikifolio:
             "country": "de",
             "language": "de",
         }
-        r = requests.get(
+        r = self.transport.request(
+            "GET",
             "https://www.wikifolio.com/api/wikifolio/{}/portfolio".format(self.name),
             params=params,
             headers=header,
             cookies=self.cookie,
         )
         r.raise_for_status()
-        raw_json = r.json()
-        details = raw_json['groups'][0]['items']
-        return [PortfolioDetail(**raw_detail) for raw_detail in details]
-
-    def buy_quote(self, amount: int, isin: str) -> OrderResponse:
-        i = 1
-        while True:
-            print(i)
-            i += 1
-            try:
-                params = {
-                    "clientProtocol": 1.5, 
-                    "connectionData": [
-                        {"name":"livehub"},
-                        {"name":"quotehub"}
-                    ],
-                    "_": int(time.time() * 1000),
-                }
-                r = requests.get(
-                    "https://www.wikifolio.com/de/de/signalr/negotiate",
-                    data = params,
-                    cookies = self.cookie
-                )
-                r.raise_for_status()
-                connection_token = r.json()["ConnectionToken"]
-                protocol_version = r.json()["ProtocolVersion"]
-
-                ws = websocket.WebSocket()
-                tid = 1 # random.randint(1, 10)
-                socket = f'wss://www.wikifolio.com/de/de/signalr/connect?transport=webSockets&clientProtocol={protocol_version}&connectionToken={connection_token}&connectionData=%5B%7B%22name%22%3A%22livehub%22%7D%2C%7B%22name%22%3A%22quotehub%22%7D%5D&tid={tid}'
-                ws.connect(socket)
-
-                wiki_id = self.wikifolio_id
-                trade_data = {
-                    'H': "quotehub", 
-                    'M': "GetQuote", 
-                    'A': [wiki_id, isin, f"{amount}", 910], #Vorletzte Ziffer Menge; 910 Buy Order, 920 Sell Order
-                    'I': 1 #Anzahl der x-Anfrage an den Server
-                    }
-
-                ws.recv_data()
-                ws.send(json.dumps(trade_data))
-
-                quoteId = ws.recv_data()
-                quoteId = json.loads(quoteId[1].decode('utf-8'))['M'][0]['A'][0]['QuoteId']
-                ws.close()
-
-                if self.twoFA_key != None:
-                    totp = TOTP(self.twoFA_key)
-                    auth = requests.post('https://www.wikifolio.com/api/totp/verify', data = totp.now(), cookies = self.cookie)
-                    cookies = auth.cookies
-                else: 
-                    cookies = self.cookie
-
-                order = {
-                    'amount': amount,
-                    'buysell': "buy",
-                    'limitPrice': "",
-                    'orderType': "quote",
-                    'quoteId': quoteId,
-                    'stopLossLimitPrice': "",
-                    'stopLossStopPrice': "",
-                    'stopPrice': "",
-                    'takeProfitLimitPrice': "",
-                    'underlyingIsin': isin,
-                    'validUntil': "",
-                    'wikifolioId': wiki_id
-                    }
-
-                r = requests.post(
-                    "https://www.wikifolio.com/api/virtualorder/placeorder",
-                    data = order,
-                    cookies = cookies
-                )
-                r.raise_for_status()
-                return OrderResponse(**r.json())
-            except:
-                pass
+        items = [item for group in r.json()["groups"] for item in group["items"]]
+        for item in items:
+            self._remember_price(item["isin"], item.get("bid"), item.get("ask"))
+        return items
+
+    def _order_cookies(self):
+        # with 2FA every order needs a fresh TOTP verification
+        if self.twoFA_key != None:
+            from pyotp import TOTP
+            totp = TOTP(self.twoFA_key)
+            auth = self.transport.request("POST", 'https://www.wikifolio.com/api/totp/verify', data = totp.now(), cookies = self.cookie, timeout = self._call_timeout("order"))
+            return auth.cookies
+        return self.cookie
+
+    def _connect_quotehub(self) -> "websocket.WebSocket":
+        """
+        Opens a SignalR websocket connection with the livehub and the quotehub (negotiate, start, connect).
+        All calls and the socket time out after twice the slow call duration of the "quote" breaker.
+        """
+        timeout = self._call_timeout("quote")
+        params = {
+            "clientProtocol": 1.5,
+            "connectionData": [
+                {"name":"livehub"},
+                {"name":"quotehub"}
+            ],
+            "_": int(time.time() * 1000),
+        }
+        r = self.transport.request(
+            "GET",
+            "https://www.wikifolio.com/de/de/signalr/negotiate",
+            data = params,
+            cookies = self.cookie,
+            timeout = timeout
+        )
+        r.raise_for_status()
+        connection_token = r.json()["ConnectionToken"]
+        protocol_version = r.json()["ProtocolVersion"]
+
+        params["transport"] = "webSockets"
+        params["connectionToken"] = connection_token
+        r = self.transport.request(
+            "GET",
+            "https://www.wikifolio.com/de/de/signalr/start",
+            data = params,
+            cookies = self.cookie,
+            timeout = timeout
+        )
+        r.raise_for_status()
+
+        ws = self.transport.websocket()
+        tid = 1
+        socket = f'wss://www.wikifolio.com/de/de/signalr/connect?transport=webSockets&clientProtocol={protocol_version}&connectionToken={connection_token}&connectionData=%5B%7B%22name%22%3A%22livehub%22%7D%2C%7B%22name%22%3A%22quotehub%22%7D%5D&tid={tid}'
+        ws.connect(socket, timeout=timeout)
+        ws.settimeout(timeout)
+        ws.recv_data()
+        return ws
+
+    def _get_quote_id(self, quote_request: str) -> str:
+        ws = self._connect_quotehub()
+        try:
+            ws.send(quote_request)
+            quoteId = ws.recv_data()
+            return json.loads(quoteId[1].decode('utf-8'))['M'][0]['A'][0]['QuoteId']
+        finally:
+            ws.close()
 
-    def sell_quote(self, amount: int, isin: str) -> OrderResponse:
-        i = 1
-        while True:
-            print(i)
-            i += 1
+    def _quote_order(self, amount: int, isin: str, buysell: str, max_attempts: int = 5) -> OrderResponse:
+        """
+        Fetches a quote and places the quote order, up to `max_attempts` times. Only failures to get a quote
+        or the TOTP cookies, placeorder error statuses and failed connects are retried; once placeorder
+        has answered with success, the order is never sent again.
+        """
+        # validates isin and amount before the retry loop
+        template = self.order_template(isin, buysell, "quote")
+        quote_request = template.quote_request(amount)
+        for attempt in range(1, max_attempts + 1):
             try:
-                params = {
-                    "clientProtocol": 1.5, 
-                    "connectionData": [
-                        {"name":"livehub"},
-                        {"name":"quotehub"}
-                    ],
-                    "_": int(time.time() * 1000),
-                }
-                r = requests.get(
-                    "https://www.wikifolio.com/de/de/signalr/negotiate",
-                    data = params,
-                    cookies = self.cookie
-                )
-                r.raise_for_status()
-                connection_token = r.json()["ConnectionToken"]
-                protocol_version = r.json()["ProtocolVersion"]
-
-                params = {
-                    "clientProtocol": 1.5, 
-                    "connectionData": [
-                        {"name":"livehub"},
-                        {"name":"quotehub"}
-                    ],
-                    "_": int(time.time() * 1000),
-                    "transport": "webSockets",
-                    "connectionToken": connection_token
-                }
-                r = requests.get(
-                    "https://www.wikifolio.com/de/de/signalr/start",
-                    data = params,
-                    cookies = self.cookie
-                )
-                r.raise_for_status()
-
-                ws = websocket.WebSocket()
-                tid = 1 # random.randint(1, 10)
-                socket = f'wss://www.wikifolio.com/de/de/signalr/connect?transport=webSockets&clientProtocol={protocol_version}&connectionToken={connection_token}&connectionData=%5B%7B%22name%22%3A%22livehub%22%7D%2C%7B%22name%22%3A%22quotehub%22%7D%5D&tid={tid}'
-                ws.connect(socket)
-
-                wiki_id = self.wikifolio_id
-                trade_data = {
-                    'H': "quotehub", 
-                    'M': "GetQuote", 
-                    'A': [wiki_id, isin, f"{amount}", 920], #Vorletzte Ziffer Menge; 910 Buy Order, 920 Sell Order
-                    'I': 1 #Anzahl der x-Anfrage an den Server
-                    }
-
-                ws.recv_data()
-                ws.send(json.dumps(trade_data))
-
-                quoteId = ws.recv_data()
-                quoteId = json.loads(quoteId[1].decode('utf-8'))['M'][0]['A'][0]['QuoteId']
-                ws.close()
-
-                if self.twoFA_key != None:
-                    totp = TOTP(self.twoFA_key)
-                    auth = requests.post('https://www.wikifolio.com/api/totp/verify', data = totp.now(), cookies = self.cookie)
-                    cookies = auth.cookies
-                else: 
-                    cookies = self.cookie
-
-                order = {
-                    'amount': amount,
-                    'buysell': "sell",
-                    'limitPrice': "",
-                    'orderType': "quote",
-                    'quoteId': quoteId,
-                    'stopLossLimitPrice': "",
-                    'stopLossStopPrice': "",
-                    'stopPrice': "",
-                    'takeProfitLimitPrice': "",
-                    'underlyingIsin': isin,
-                    'validUntil': "",
-                    'wikifolioId': wiki_id
-                    }
-
-                r = requests.post(
-                    "https://www.wikifolio.com/api/virtualorder/placeorder",
-                    data = order,
-                    cookies = cookies
-                )
-                r.raise_for_status()
-                return OrderResponse(**r.json())
-            except:
-                pass
+                quoteId = self.circuit_breaker("quote").call(self._get_quote_id, quote_request)
+                cookies = self._order_cookies()
+            except CircuitOpenError:
+                if self.quote_fallback:
+                    return self._fallback_limit_order(amount, isin, buysell)
+                raise
+            except Exception:
+                if attempt == max_attempts:
+                    raise
+                continue
+            try:
+                raw_response = self.circuit_breaker("order").call(self._post_order, template.encode(amount=amount, quote_id=quoteId), cookies)
+            except (requests.HTTPError, requests.ConnectTimeout):
+                # placeorder answered with an error status or was never reached, so the order was not accepted
+                if attempt == max_attempts:
+                    raise
+                continue
+            return OrderResponse(**raw_response)
+
+    def _fallback_limit_order(self, amount: int, isin: str, buysell: str) -> OrderResponse:
+        """
+        Places a limit order at the last known ask (buy) or bid (sell) instead of a quote order.
+        """
+        bid, ask = (self._last_prices or {}).get(isin, (None, None))
+        limit_price = ask if buysell == "buy" else bid
+        if not limit_price:
+            raise CircuitOpenError("Quote circuit breaker is open and there is no known price for {}".format(isin))
+        return self.place_order(self.order_template(isin, buysell), amount=amount, limit_price=limit_price)
 
-    def get_price_information(self) -> PriceInformation:
-        headers = {"Accept": "application/json"}
-        params = {"country": "de", "language": "de"}
-        r = requests.get(
-            "https://www.wikifolio.com/api/wikifolio/{}/price".format(self.wikifolio_id),
-            params = params,
-            headers = headers
-        )
-        r.raise_for_status()
-        return PriceInformation(**r.json())
+    def buy_quote(self, amount: int, isin: str, max_attempts: int = 5) -> OrderResponse:
+        return self._quote_order(amount, isin, "buy", max_attempts)
+
+    def sell_quote(self, amount: int, isin: str, max_attempts: int = 5) -> OrderResponse:
+        return self._quote_order(amount, isin, "sell", max_attempts)
 
-    
     # ! bad style to return "False, 0" etc.
     def is_in_portfolio(self, isin: str) -> typing.Tuple[bool, int]:
         """
@@ -906,7 +1200,8 @@ class Wikifolio:
         params = {
             "order": order_uuid,
         }
-        r = requests.post(
+        r = self.transport.request(
+            "POST",
             "https://www.wikifolio.com/dynamic/de/de/publish/removevirtualorder",
             data=params,
             cookies=self.cookie,
@@ -914,3 +1209,61 @@ class Wikifolio:
         r.raise_for_status()
         raw_json = r.json()
         return raw_json
+
+    def _cancel_order(self, order_uuid: str) -> CancelResult:
+        try:
+            return CancelResult(order_uuid, True, self.remove_order(order_uuid))
+        except Exception as e:
+            return CancelResult(order_uuid, False, error=str(e))
+
+    def remove_orders(self, order_uuids: typing.List[str], max_workers: int = 8) -> typing.List[CancelResult]:
+        """
+        Cancels many orders concurrently (at most `max_workers` requests at a time). Returns one result per
+        order in the given order, failures are reported in the result instead of raised.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self._cancel_order, order_uuids))
+
+    def get_open_orders(self, page_size: int = 100, max_pages: int = 10) -> typing.List[Order]:
+        """
+        Collects the orders of the trade history which are not executed yet (no execution date).
+        """
+        open_orders = []
+        for page in range(max_pages):
+            count = 0
+            for order in self.iter_trade_history(page, page_size):
+                count += 1
+                if not order.executionDate:
+                    open_orders.append(order)
+            if count < page_size:
+                break
+        return open_orders
+
+    def remove_open_orders(self, max_workers: int = 8) -> typing.List[CancelResult]:
+        return self.remove_orders([order.id for order in self.get_open_orders()], max_workers)
+
+def _snapshot_from_page(name: str, content: bytes, metrics: typing.List[str]) -> WikifolioSnapshot:
+    # runs in the worker processes of Wikifolio.get_snapshots
+    wf = Wikifolio._from_raw_data(name, Wikifolio._parse_wikifolio_page(content))
+    return WikifolioSnapshot(name, wf.wikifolio_id, tuple(wf._key_figure_row(metrics)))
+
+def remove_all_open_orders(wikifolios: typing.List[Wikifolio], max_workers: int = 8) -> typing.Dict[str, typing.List[CancelResult]]:
+    """
+    Cancels the open orders of all given wikifolios, sharing one pool of `max_workers` requests.
+    Returns the results per wikifolio name. If the open orders of a wikifolio can't be loaded, its result
+    is a single failed CancelResult without order uuid, the other wikifolios are cancelled regardless.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        lookups = {wf.name: executor.submit(wf.get_open_orders) for wf in wikifolios}
+        futures = {}
+        failed = {}
+        for wf in wikifolios:
+            try:
+                open_orders = lookups[wf.name].result()
+            except Exception as e:
+                failed[wf.name] = [CancelResult(None, False, error="Could not load open orders: {}".format(e))]
+                continue
+            futures[wf.name] = [executor.submit(wf._cancel_order, order.id) for order in open_orders]
+        results = {name: [future.result() for future in name_futures] for name, name_futures in futures.items()}
+    results.update(failed)
+    return {wf.name: results[wf.name] for wf in wikifolios}